@@ -0,0 +1,253 @@
+from filecmp import cmp
+from json import dump, load
+from os import listdir, path, remove, rename, symlink
+from shutil import copy, copytree, rmtree
+from subprocess import run
+from sys import argv, executable, exit, stderr
+from tempfile import mkdtemp
+from time import time
+
+from make_fixture import make_fixture
+from ppf import apply_ppf
+
+
+PACKAGE_PATH = path.dirname(path.abspath(__file__))
+FLAG_COMBINATIONS = ['.', 'a', 'c', 'e', 'g', 'm', 'n', 'q', 's', 't']
+PHASES = ['run_interface', 'randomize', 'activate_codes',
+          'write_seed_number', 'rewrite_master_list', 'clean_and_write',
+          'write_spoiler', 'write_cue_file', 'finish_interface',
+          'write_ppf_file']
+ALL_FLAGS = ''.join(FLAG_COMBINATIONS[1:])
+REROLL_FAMILIES = ['shops', 'treasure', 'masters']
+
+
+def percentile(values, p):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p * (len(values) - 1))))
+    return values[index]
+
+
+def setup_workdir(version):
+    workdir = mkdtemp(prefix='bof3r_benchmark_')
+    for filename in ['randomizer.py', 'ppf.py']:
+        copy(path.join(PACKAGE_PATH, filename), workdir)
+    copytree(path.join(PACKAGE_PATH, 'tables'), path.join(workdir, 'tables'))
+    symlink(path.join(PACKAGE_PATH, 'randomtools'),
+            path.join(workdir, 'randomtools'))
+
+    image = path.join(workdir, 'synthetic.bin')
+    checksum = make_fixture(image, version=version)
+    with open(path.join(workdir, 'tables', 'master.txt'), 'a') as f:
+        f.write('BOF3_SYNTHETIC      {0}    tables_list_{1}.txt\n'.format(
+            checksum, version))
+    return workdir, image
+
+
+def run_batch(workdir, image, flags, seeds, processes, reroll=None):
+    jobfile = path.join(workdir, 'jobs.txt')
+    with open(jobfile, 'w') as f:
+        for seed in seeds:
+            f.write('{0} {1}\n'.format(seed, flags))
+
+    command = [executable, 'randomizer.py', '--batch', jobfile, image,
+               str(processes), '--ppf', '--profile']
+    if reroll:
+        command.append('--reroll={0}'.format(reroll))
+    start_time = time()
+    result = run(command, cwd=workdir, capture_output=True, text=True)
+    elapsed = time() - start_time
+    if result.returncode != 0:
+        print(result.stdout)
+        print(result.stderr, file=stderr)
+        raise Exception('Batch run with flags "{0}" failed with exit code '
+                        '{1}.'.format(flags, result.returncode))
+    return elapsed, result.stdout
+
+
+def clean_workdir(workdir):
+    for filename in listdir(workdir):
+        if (filename.startswith('bof3r_') or filename.endswith('.ppf')
+                or filename.endswith('.settings.json')):
+            remove(path.join(workdir, filename))
+
+
+def patch_image(workdir, image, patchfile, filename):
+    patched = path.join(workdir, filename)
+    copy(image, patched)
+    apply_ppf(patchfile, patched)
+    return patched
+
+
+def check_reroll(workdir, image, flags, seed, family):
+    # The reroll is built once over the seed's earlier output, and once more
+    # from scratch with that output moved aside. Both must be identical.
+    base = path.splitext(image)[0]
+    seed_patch = '{0}.{1}.ppf'.format(base, seed)
+    reroll_patch = '{0}.{1}.{2}1.ppf'.format(base, seed, family)
+    reroll = '{0}:1'.format(family)
+
+    _, output = run_batch(workdir, image, flags, [seed], 1, reroll=reroll)
+    if 'rerolled over the earlier output' not in output:
+        raise Exception('Rerolling {0} did not reuse the output of seed '
+                        '{1}.'.format(family, seed))
+    restored = patch_image(workdir, image, reroll_patch, 'restored.bin')
+    rename(seed_patch, seed_patch + '.hidden')
+    try:
+        run_batch(workdir, image, flags, [seed], 1, reroll=reroll)
+    finally:
+        rename(seed_patch + '.hidden', seed_patch)
+    scratch = patch_image(workdir, image, reroll_patch, 'scratch.bin')
+
+    identical = cmp(restored, scratch, shallow=False)
+    remove(restored)
+    remove(scratch)
+    if not identical:
+        raise Exception('Rerolling {0} over seed {1} does not match the same '
+                        'reroll made from scratch.'.format(family, seed))
+
+
+def check_reroll_settings(workdir, image, flags, seed):
+    # A job line that no longer matches the seed's earlier output must not
+    # reuse it.
+    _, output = run_batch(workdir, image, '{0} 0.25'.format(flags), [seed], 1,
+                          reroll='{0}:1'.format(REROLL_FAMILIES[0]))
+    if 'rerolled over the earlier output' in output:
+        raise Exception('A reroll with a different randomness reused the '
+                        'output of seed {0}.'.format(seed))
+
+
+def check_interactive(workdir, image, seed, patchfile):
+    # Batch workers reset their per-seed state themselves instead of going
+    # through run_interface, so a batch seed must come out byte-identical to
+    # the same seed made interactively.
+    before = set(listdir(workdir))
+    command = [executable, 'randomizer.py', image, ALL_FLAGS, str(seed),
+               '0.5', '1.0']
+    result = run(command, cwd=workdir, input='\n' * 10, capture_output=True,
+                 text=True)
+    created = sorted(set(listdir(workdir)) - before)
+    outputs = [f for f in created
+               if path.splitext(f)[1] == path.splitext(image)[1]]
+    if result.returncode != 0 or len(outputs) != 1:
+        print(result.stdout)
+        print(result.stderr, file=stderr)
+        raise Exception('Interactive run of seed {0} did not produce an '
+                        'image.'.format(seed))
+
+    batch = patch_image(workdir, image, patchfile, 'batch.bin')
+    identical = cmp(path.join(workdir, outputs[0]), batch, shallow=False)
+    remove(batch)
+    for filename in created:
+        if path.exists(path.join(workdir, filename)):
+            remove(path.join(workdir, filename))
+    if not identical:
+        raise Exception('Batch seed {0} does not match the same seed made '
+                        'interactively.'.format(seed))
+
+
+def smoke_test(workdir, image):
+    seed, flags = 1, '.'
+    run_batch(workdir, image, flags, [seed], 1)
+
+    patchfile = '{0}.{1}.ppf'.format(path.splitext(image)[0], seed)
+    for filename in [patchfile,
+                     path.join(workdir, 'bof3r_spoiler_{0}.txt'.format(seed)),
+                     path.join(workdir, 'bof3r_profile_{0}.json'.format(seed))]:
+        if not path.exists(filename):
+            raise Exception('Smoke test did not produce {0}.'.format(
+                path.basename(filename)))
+
+    patched = patch_image(workdir, image, patchfile, 'patched.bin')
+    unchanged = cmp(image, patched, shallow=False)
+    remove(patched)
+    if unchanged:
+        raise Exception('Smoke test patch did not change the image.')
+
+    for family in REROLL_FAMILIES:
+        check_reroll(workdir, image, flags, seed, family)
+    check_reroll_settings(workdir, image, flags, seed)
+    check_interactive(workdir, image, seed, patchfile)
+    clean_workdir(workdir)
+    print('Smoke test passed: seed {0} with all flags went through the '
+          'whole pipeline and matched the same seed made interactively, '
+          'each reroll family matched its reroll from scratch, and a '
+          'changed job did not reuse the seed.'.format(seed))
+
+
+def run_flags(workdir, image, flags, seeds, processes):
+    elapsed, _ = run_batch(workdir, image, flags, seeds, processes)
+
+    latencies, phases = [], {phase: [] for phase in PHASES}
+    for seed in seeds:
+        filename = path.join(workdir, 'bof3r_profile_{0}.json'.format(seed))
+        if not path.exists(filename):
+            continue
+        with open(filename) as f:
+            timings = load(f)['timings']
+        latencies.append(sum(timings[p]['wall'] for p in PHASES
+                             if p in timings))
+        for phase in PHASES:
+            if phase in timings:
+                phases[phase].append(timings[phase]['wall'])
+
+    clean_workdir(workdir)
+
+    result = {'flags': flags, 'seeds': len(seeds),
+              'completed': len(latencies), 'elapsed': elapsed,
+              'seeds_per_second': len(latencies) / elapsed}
+    if latencies:
+        result['latency'] = {
+            'p50': percentile(latencies, 0.5),
+            'p90': percentile(latencies, 0.9),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies),
+            }
+        result['phases'] = {phase: sum(values) / len(values)
+                            for (phase, values) in phases.items() if values}
+    return result
+
+
+def report(result):
+    s = '{0:10} {1:>3}/{2:<3} {3:7.2f} seeds/s'.format(
+        result['flags'], result['completed'], result['seeds'],
+        result['seeds_per_second'])
+    if 'latency' in result:
+        s += ' | p50 {p50:.2f}s p90 {p90:.2f}s p99 {p99:.2f}s ' \
+             'max {max:.2f}s'.format(**result['latency'])
+        for phase, value in sorted(result['phases'].items()):
+            s += '\n    {0:20} {1:8.3f}s'.format(phase, value)
+    return s
+
+
+if __name__ == '__main__':
+    smoke = '--smoke' in argv
+    if smoke:
+        argv.remove('--smoke')
+    args = [a for a in argv[1:] if not a.startswith('--json=')]
+    json_outfile = [a.split('=', 1)[1] for a in argv[1:]
+                    if a.startswith('--json=')]
+    if len(args) > 3:
+        print('Usage: benchmark.py [SEEDS [PROCESSES [VERSION]]] '
+              '[--json=OUTFILE] [--smoke]')
+        exit(2)
+    num_seeds = int(args[0]) if len(args) >= 1 else 8
+    processes = int(args[1]) if len(args) >= 2 else 0
+    version = args[2] if len(args) >= 3 else '1.1'
+
+    workdir, image = setup_workdir(version)
+    results = []
+    try:
+        smoke_test(workdir, image)
+        if smoke:
+            exit(0)
+        for (n, flags) in enumerate(FLAG_COMBINATIONS):
+            seeds = [(n * 1000) + i for i in range(1, num_seeds + 1)]
+            result = run_flags(workdir, image, flags, seeds, processes)
+            print(report(result))
+            results.append(result)
+    finally:
+        rmtree(workdir)
+
+    if json_outfile:
+        with open(json_outfile[0], 'w+') as f:
+            dump(results, f, indent=2)
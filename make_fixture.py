@@ -0,0 +1,625 @@
+from collections import defaultdict
+from hashlib import md5
+from os import path
+from random import Random
+from sys import argv, exit
+
+
+TABLES_PATH = path.join(path.dirname(path.abspath(__file__)), 'tables')
+SECTOR_LENGTH = 2352
+DATA_LENGTH = 2048
+SYNC = b'\x00' + (b'\xff' * 10) + b'\x00'
+SUBMODE_DATA = 0x08
+SUBMODE_END = 0x89
+FIRST_FILE_SECTOR = 24
+CHARACTERS = ['Ryu', 'Nina', 'Garr', 'Teepo', 'Rei', 'Momo', 'Peco', 'Whelp']
+MASTERS = 17
+ELEMENTS = ['fire', 'ice', 'lightning', 'earth', 'wind', 'holy']
+NAMED_ABILITIES = {1: 'Backhand', 2: 'Pilfer', 3: 'Head Cracker',
+                   4: 'Nue Stomp', 5: 'Steal'}
+LEVELUP_ABILITIES = range(10, 70)
+MASTER_ABILITIES = [1, 2] + list(range(70, 120))
+FISH = range(0x38, 0x4d)
+
+
+def get_edc_table():
+    table = []
+    for i in range(0x100):
+        edc = i
+        for _ in range(8):
+            edc = (edc >> 1) ^ (0xd8018001 if edc & 1 else 0)
+        table.append(edc)
+    return table
+
+
+def get_ecc_tables():
+    f_table, b_table = [0] * 0x100, [0] * 0x100
+    for i in range(0x100):
+        j = (i << 1) ^ (0x11d if i & 0x80 else 0)
+        f_table[i] = j
+        b_table[i ^ j] = i
+    return f_table, b_table
+
+
+EDC_TABLE = get_edc_table()
+ECC_F_TABLE, ECC_B_TABLE = get_ecc_tables()
+
+
+def get_edc(data):
+    edc = 0
+    for c in data:
+        edc = (edc >> 8) ^ EDC_TABLE[(edc ^ c) & 0xff]
+    return edc.to_bytes(4, 'little')
+
+
+def get_ecc_block(data, major_count, minor_count, major_mult, minor_inc):
+    size = major_count * minor_count
+    parity = bytearray(major_count * 2)
+    for major in range(major_count):
+        index = (major >> 1) * major_mult + (major & 1)
+        ecc_a, ecc_b = 0, 0
+        for _ in range(minor_count):
+            value = data[index]
+            index += minor_inc
+            if index >= size:
+                index -= size
+            ecc_a ^= value
+            ecc_b ^= value
+            ecc_a = ECC_F_TABLE[ecc_a]
+        ecc_a = ECC_B_TABLE[ECC_F_TABLE[ecc_a] ^ ecc_b]
+        parity[major] = ecc_a
+        parity[major + major_count] = ecc_a ^ ecc_b
+    return bytes(parity)
+
+
+def get_edc_ecc(subheader_data):
+    # Mode 2 ECC is computed with a zeroed header, so the result only
+    # depends on the subheader and the user data.
+    edc = get_edc(subheader_data)
+    block = (b'\x00' * 4) + subheader_data + edc
+    p_parity = get_ecc_block(block, 86, 24, 2, 86)
+    q_parity = get_ecc_block(block + p_parity, 52, 43, 86, 88)
+    return edc + p_parity + q_parity
+
+
+def to_bcd(value):
+    return ((value // 10) << 4) | (value % 10)
+
+
+class SectorWriter:
+    def __init__(self, f):
+        self.f = f
+        self.lba = 0
+        self.edc_ecc_cache = {}
+
+    def write(self, data, submode=SUBMODE_DATA):
+        assert len(data) <= DATA_LENGTH
+        data = data.ljust(DATA_LENGTH, b'\x00')
+        subheader = bytes([0, 0, submode, 0]) * 2
+        key = subheader + data
+        if key not in self.edc_ecc_cache:
+            self.edc_ecc_cache[key] = get_edc_ecc(key)
+
+        minutes, seconds = divmod((self.lba + 150) // 75, 60)
+        frames = (self.lba + 150) % 75
+        header = bytes([to_bcd(minutes), to_bcd(seconds), to_bcd(frames), 2])
+        self.f.write(SYNC + header + key + self.edc_ecc_cache[key])
+        self.lba += 1
+
+    def write_file(self, data):
+        num_sectors = max(1, (len(data) + DATA_LENGTH - 1) // DATA_LENGTH)
+        for i in range(num_sectors):
+            submode = SUBMODE_END if i == num_sectors - 1 else SUBMODE_DATA
+            self.write(data[i*DATA_LENGTH:(i+1)*DATA_LENGTH], submode)
+
+
+def both_endian(value, length):
+    return (value.to_bytes(length, 'little') +
+            value.to_bytes(length, 'big'))
+
+
+def directory_record(name, lba, length, is_directory):
+    record = bytearray([0, 0])
+    record += both_endian(lba, 4)
+    record += both_endian(length, 4)
+    record += bytes([99, 1, 1, 0, 0, 0, 0])
+    record += bytes([2 if is_directory else 0, 0, 0])
+    record += both_endian(1, 2)
+    record += bytes([len(name)]) + name
+    if len(record) % 2:
+        record += b'\x00'
+    record[0] = len(record)
+    return bytes(record)
+
+
+def build_directory(records):
+    sectors = [b'']
+    for record in records:
+        if len(sectors[-1]) + len(record) > DATA_LENGTH:
+            sectors.append(b'')
+        sectors[-1] += record
+    return sectors
+
+
+def write_iso(filename, files):
+    directories = {'': None}
+    for filepath in files:
+        parts = filepath.split('/')
+        for i in range(1, len(parts)):
+            directories['/'.join(parts[:i])] = None
+    directory_names = sorted(directories,
+                             key=lambda d: (d.count('/'), d) if d else (-1, d))
+
+    def children(dirname):
+        prefix = dirname + '/' if dirname else ''
+        subdirs = [d for d in directory_names if d and d.startswith(prefix)
+                   and '/' not in d[len(prefix):]]
+        subfiles = [f for f in sorted(files) if f.startswith(prefix)
+                    and '/' not in f[len(prefix):]]
+        return subdirs, subfiles
+
+    # Directory sizes only depend on the names they hold, so they can be
+    # laid out before any extent is known.
+    directory_sizes = {}
+    for d in directory_names:
+        subdirs, subfiles = children(d)
+        records = [directory_record(b'\x00', 0, 0, True),
+                   directory_record(b'\x01', 0, 0, True)]
+        records += [directory_record(s.split('/')[-1].encode(), 0, 0, True)
+                    for s in subdirs]
+        records += [directory_record(
+            (f.split('/')[-1] + ';1').encode(), 0, 0, False)
+            for f in subfiles]
+        directory_sizes[d] = len(build_directory(records))
+
+    lba = FIRST_FILE_SECTOR
+    extents = {}
+    for d in directory_names:
+        extents[d] = (lba, directory_sizes[d] * DATA_LENGTH)
+        lba += directory_sizes[d]
+    for f in sorted(files):
+        extents[f] = (lba, len(files[f]))
+        lba += max(1, (len(files[f]) + DATA_LENGTH - 1) // DATA_LENGTH)
+    total_sectors = lba
+
+    directory_data = {}
+    for d in directory_names:
+        subdirs, subfiles = children(d)
+        parent = '/'.join(d.split('/')[:-1]) if d else ''
+        records = [directory_record(b'\x00', *extents[d], True),
+                   directory_record(b'\x01', *extents[parent], True)]
+        records += [directory_record(s.split('/')[-1].encode(),
+                                     *extents[s], True) for s in subdirs]
+        records += [directory_record((f.split('/')[-1] + ';1').encode(),
+                                     *extents[f], False) for f in subfiles]
+        directory_data[d] = build_directory(records)
+
+    path_table_l, path_table_m = b'', b''
+    for d in directory_names:
+        name = d.split('/')[-1].encode() if d else b'\x00'
+        parent = '/'.join(d.split('/')[:-1]) if d else ''
+        parent_number = directory_names.index(parent) + 1
+        lba = extents[d][0]
+        padding = b'\x00' if len(name) % 2 else b''
+        path_table_l += (bytes([len(name), 0]) + lba.to_bytes(4, 'little') +
+                         parent_number.to_bytes(2, 'little') + name + padding)
+        path_table_m += (bytes([len(name), 0]) + lba.to_bytes(4, 'big') +
+                         parent_number.to_bytes(2, 'big') + name + padding)
+
+    pvd = bytearray(DATA_LENGTH)
+    pvd[0:7] = b'\x01CD001\x01'
+    pvd[8:40] = b'PLAYSTATION'.ljust(32)
+    pvd[40:72] = b'BOF3_SYNTHETIC'.ljust(32)
+    pvd[80:88] = both_endian(total_sectors, 4)
+    pvd[120:124] = both_endian(1, 2)
+    pvd[124:128] = both_endian(1, 2)
+    pvd[128:132] = both_endian(DATA_LENGTH, 2)
+    pvd[132:140] = both_endian(len(path_table_l), 4)
+    pvd[140:144] = (18).to_bytes(4, 'little')
+    pvd[148:152] = (20).to_bytes(4, 'big')
+    pvd[156:190] = directory_record(b'\x00', *extents[''], True)
+    for (offset, length) in [(190, 128), (318, 128), (446, 128),
+                             (574, 128), (702, 37), (739, 37), (776, 37)]:
+        pvd[offset:offset+length] = b' ' * length
+    for offset in [813, 830, 847, 864]:
+        pvd[offset:offset+17] = b'0' * 16 + b'\x00'
+    pvd[881] = 1
+
+    with open(filename, 'wb') as f:
+        writer = SectorWriter(f)
+        for _ in range(16):
+            writer.write(b'')
+        writer.write(bytes(pvd), SUBMODE_END)
+        writer.write(b'\xffCD001\x01', SUBMODE_END)
+        for table in [path_table_l, path_table_l,
+                      path_table_m, path_table_m]:
+            writer.write(table, SUBMODE_END)
+        while writer.lba < FIRST_FILE_SECTOR:
+            writer.write(b'')
+        for d in directory_names:
+            for (i, data) in enumerate(directory_data[d]):
+                last = i == len(directory_data[d]) - 1
+                writer.write(data, SUBMODE_END if last else SUBMODE_DATA)
+        for f in sorted(files):
+            assert writer.lba == extents[f][0]
+            writer.write_file(files[f])
+
+
+def read_struct(filename):
+    fields = []
+    with open(path.join(TABLES_PATH, filename)) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            name, size = line.split(',')[:2]
+            kind = line.split(',')[2] if line.count(',') >= 2 else 'int'
+            if size.startswith('bit:'):
+                fields.append((name, 1, 1, 'bit'))
+            elif 'x' in size:
+                count, width = size.split('x')
+                fields.append((name, int(count), int(width), kind))
+            elif kind in ['list', 'str']:
+                fields.append((name, int(size), 1, kind))
+            else:
+                fields.append((name, 1, int(size), 'int'))
+    return fields
+
+
+def read_pointers(filename):
+    pointers = []
+    with open(path.join(TABLES_PATH, filename)) as f:
+        for line in f:
+            if '#' in line:
+                line, _ = line.split('#', 1)
+            line = line.strip()
+            if line:
+                pointer, filepath = line.split('@')
+                pointers.append((int(pointer, 0x10), filepath))
+    return pointers
+
+
+def read_tables_list(filename):
+    tables, patches, addresses = [], [], {}
+    with open(path.join(TABLES_PATH, filename)) as f:
+        for line in f:
+            values = line.split()
+            if not values:
+                continue
+            if values[0] in ['.patch', '.option']:
+                patches.append(values[1])
+            elif values[0].startswith('$'):
+                addresses[values[0][1:]] = int(values[1], 0x10)
+            elif len(values) == 4:
+                objname, structfile, pointer, count = values
+                if '@' not in pointer:
+                    continue
+                pointer, filepath = pointer.split('@')
+                fields = read_struct(structfile)
+                length = sum(count * width for (_, count, width, _) in fields)
+                pointers = [(int(pointer, 0x10) + (i * length), filepath)
+                            for i in range(int(count))]
+                tables.append((objname, fields, pointers))
+            else:
+                objname, structfile, pointerfile = values
+                tables.append((objname, read_struct(structfile),
+                               read_pointers(pointerfile)))
+    return tables, patches, addresses
+
+
+class RecordMaker:
+    def __init__(self, random, tables):
+        self.random = random
+        self.counts = {objname: len(pointers)
+                       for (objname, _, pointers) in tables}
+        self.files = {objname: [f for (_, f) in pointers]
+                      for (objname, _, pointers) in tables}
+
+    def name(self, prefix, index):
+        return '{0} {1:0>2X}'.format(prefix, index)
+
+    def item(self):
+        item_type = self.random.randint(0, 3)
+        objname = ['ItemObject', 'WeaponObject', 'ArmorObject',
+                   'AccessoryObject'][item_type]
+        item_index = self.random.randint(1, self.counts[objname] - 1)
+        if item_type == 0:
+            item_index = self.random.randint(1, 0x4d)
+        return item_type, item_index
+
+    def equipability(self):
+        value = 0
+        while not value & 0x77:
+            value = self.random.randint(1, 0x77) | 0x08
+        return value
+
+    def make_item(self, index, prefix):
+        data = {'item_name': self.name(prefix, index) if index else 'Nothing',
+                'price': self.random.randint(10, 5000) if index else 0}
+        if prefix == 'Fish':
+            data['price'] = self.random.randint(10, 400)
+        return data
+
+    def make_ItemObject(self, index):
+        return self.make_item(index, 'Fish' if index in FISH else 'Item')
+
+    def make_WeaponObject(self, index):
+        data = self.make_item(index, 'Weapon')
+        if index == 0x47:
+            data['item_name'] = 'Flame Chrysm'
+        data['equipability'] = self.equipability() if index else 0
+        data['power'] = self.random.randint(1, 200)
+        return data
+
+    def make_ArmorObject(self, index):
+        data = self.make_item(index, 'Armor')
+        data['equipability'] = self.equipability() if index else 0
+        data['equip_type'] = index % 3
+        return data
+
+    def make_AccessoryObject(self, index):
+        data = self.make_item(index, 'Acc')
+        data['equipability'] = self.equipability() if index else 0
+        return data
+
+    def make_KeyItemObject(self, index):
+        return {'item_name': self.name('Key', index)}
+
+    def make_AbilityObject(self, index):
+        if index == 0:
+            return {}
+        data = {'ability_name': NAMED_ABILITIES.get(
+                    index, self.name('Skill', index)),
+                'cost': self.random.randint(0, 30),
+                'power': self.random.randint(0, 100)}
+        element = self.random.choice(ELEMENTS + ['psionic', 'status', None])
+        if element is not None:
+            data['element'] = 1 << (ELEMENTS + ['psionic', 'status']).index(
+                element)
+        is_offense = self.random.random() < 0.6
+        data['misc'] = 0x20 if is_offense else 0
+        if index in MASTER_ABILITIES:
+            data['unknown2'] = 0x02
+            data['skill_type'] = 3
+        elif element in ['psionic', 'status']:
+            data['skill_type'] = 1
+        else:
+            data['skill_type'] = 2 if is_offense else 0
+        return data
+
+    def make_LevelObject(self, index):
+        level = (index % 99) + 1
+        data = {'exp': level * level * 6,
+                'hp': self.random.randint(5, 30),
+                'ap': self.random.randint(1, 8),
+                'pwr_dfn': self.random.randint(0, 0x33),
+                'agi_int': self.random.randint(0, 0x33)}
+        if level % 12 == 0:
+            character = index // 99
+            abilities = LEVELUP_ABILITIES[character*8:(character+1)*8]
+            data['ability'] = abilities[(level // 12) - 1]
+        return data
+
+    def make_ShopObject(self, index):
+        num_items = self.random.randint(3, 8)
+        items = set()
+        while len(items) < num_items:
+            items.add(self.item())
+        items = [(item_index << 8) | item_type
+                 for (item_type, item_index) in sorted(items)]
+        items += [0] * (11 - len(items))
+        return {'num_items': num_items, 'item_type_item_indexes': items}
+
+    def make_MasterSkillsObject(self, index):
+        skills = self.random.sample(MASTER_ABILITIES[2:],
+                                    self.random.randint(2, 5))
+        if index == 0:
+            skills[0] = 1
+        levels = sorted(self.random.sample(range(1, 99), len(skills)))
+        skill_levels = [level | (skill << 8)
+                        for (skill, level) in zip(skills, levels)]
+        while len(skill_levels) < 6:
+            skill_levels.append(0xff63)
+        return {'skill_levels': skill_levels}
+
+    def make_MasterStatsObject(self, index):
+        return {attr: self.random.randint(-3, 3) & 0xff
+                for attr in ['hp', 'ap', 'pwr', 'dfn', 'agi', 'int']}
+
+    def make_BaseStatsObject(self, index):
+        name = CHARACTERS[index]
+        data = {'character_name': name, 'character_index': index,
+                'level': 1, 'accuracy': 90, 'evasion': 5,
+                'critical_chance': 5, 'resistances': [3] * 9}
+        for stat in ['hp', 'ap', 'pwr', 'dfn', 'agi', 'int']:
+            data[stat] = self.random.randint(5, 40)
+            data['base_%s' % stat] = data[stat]
+        data['current_hp'], data['current_ap'] = data['hp'], data['ap']
+        for attr in ['resistances', 'surprise_chance', 'reprisal_chance',
+                     'critical_chance', 'evasion', 'accuracy']:
+            if attr in data:
+                data['base_%s' % attr] = data[attr]
+        return data
+
+    make_BaseStats2Object = make_BaseStatsObject
+
+    def make_ManilloStockObject(self, index):
+        if index in [0, 2, 7, 9, 0xb, 0xd, 0xf]:
+            trades = self.random.sample(range(self.counts['ManilloItemObject']),
+                                        self.random.randint(3, 10))
+        else:
+            trades = []
+        return {'trade_indexes': trades + [0xff] * (10 - len(trades))}
+
+    def make_ManilloItemObject(self, index):
+        item_type, item_index = self.item()
+        fishes = self.random.sample(range(len(FISH)),
+                                    self.random.randint(1, 3))
+        quantities = [self.random.randint(1, 9) for _ in fishes]
+        while len(fishes) < 3:
+            fishes.append(0xff)
+            quantities.append(0)
+        return {'item_type': item_type, 'item_index': item_index,
+                'fish_indexes': fishes, 'fish_quantities': quantities}
+
+    def make_ChestObject(self, index):
+        if self.random.random() < 0.2:
+            data = {'item_type': 0xff,
+                    'item_index': self.random.randint(5, 100)}
+        else:
+            item_type, item_index = self.item()
+            data = {'item_type': item_type, 'item_index': item_index}
+        data['memory'] = index % 0xfe
+        return data
+
+    def make_acquire_item(self, index):
+        item_type, item_index = self.item()
+        return {'item_type': item_type, 'item_index': item_index,
+                'num_battles': self.random.randint(1, 50)}
+
+    make_FairyGiftObject = make_acquire_item
+    make_FairyExploreObject = make_acquire_item
+    make_FairyPrizeObject = make_acquire_item
+
+    def make_FairyObject(self, index):
+        return {'fairy_name': 'Fae%s' % (index % 100),
+                'stats': [self.random.randint(1, 9) for _ in range(4)]}
+
+    def make_GeneObject(self, index):
+        return {'gene_index': index}
+
+    def make_ChrysmObject(self, index):
+        filename = self.files['ChrysmObject'][index]
+        return {'gene_index': self.files['GeneObject'].index(filename)}
+
+    def make_FormationObject(self, index):
+        filename = self.files['FormationObject'][index]
+        num_monsters = self.files['MonsterObject'].count(filename)
+        if not num_monsters:
+            return {'monster_indexes': [0xff] * 8}
+        monsters = [self.random.randint(0, num_monsters - 1)
+                    for _ in range(self.random.randint(1, 4))]
+        return {'monster_indexes': monsters + [0xff] * (8 - len(monsters)),
+                'appearance_rate': 0 if index % 10 == 0 else 0x10}
+
+    def make_MonsterObject(self, index):
+        # Every fourth record repeats the previous one, to give DupeMixin
+        # some duplicates to group.
+        if index % 4 == 1:
+            return self.previous_monster
+        rank = index / self.counts['MonsterObject']
+        name = self.name('Mon', index // 2)
+        if index in [100, 101]:
+            name = ['Gary', 'Mogu'][index - 100]
+        skills = self.random.sample(range(5, 228), 4)
+        data = {'monster_name': name,
+                'level': max(1, int(rank * 60)),
+                'exp': int(rank * 3000) + 1,
+                'zenny': int(rank * 500),
+                'hp': int(rank * 6000) + 10,
+                'resistances': [self.random.randint(0, 7) for _ in range(9)],
+                'initial_skills': skills + [0] * 4,
+                'steal_rate': self.random.randint(0, 6),
+                'drop_rate': self.random.randint(0, 6)}
+        for stat in ['ap', 'pwr', 'dfn', 'agi', 'int']:
+            data[stat] = int(rank * 400) + self.random.randint(1, 20)
+        for attr in ['steal', 'drop']:
+            item_type, item_index = self.item()
+            data['%s_item_type' % attr] = item_type
+            data['%s_item_index' % attr] = item_index
+        for i in range(1, 5):
+            data['condition%s' % i] = 99
+            data['skills%s' % i] = [0] * 8
+        self.previous_monster = data
+        return data
+
+    def make(self, objname, index):
+        maker = getattr(self, 'make_%s' % objname, None)
+        if maker is None:
+            return {}
+        return maker(index)
+
+
+def encode_record(fields, data):
+    record = b''
+    for (name, count, width, kind) in fields:
+        value = data.get(name, 0)
+        if kind == 'str':
+            value = (value or '').encode('ascii')[:count]
+            record += value.ljust(count, b'\x00')
+        elif kind == 'list':
+            if not isinstance(value, list):
+                value = [value] * count
+            assert len(value) == count
+            for v in value:
+                record += v.to_bytes(width, 'little')
+        else:
+            record += value.to_bytes(width, 'little')
+    return record
+
+
+def make_fixture(outfile, version='1.1', seed=0):
+    random = Random(seed)
+    tables, patches, addresses = read_tables_list(
+        'tables_list_{0}.txt'.format(version))
+    maker = RecordMaker(random, tables)
+
+    writes = []
+    for (objname, fields, pointers) in tables:
+        for (index, (pointer, filepath)) in enumerate(pointers):
+            record = encode_record(fields, maker.make(objname, index))
+            writes.append((filepath, pointer, record))
+
+    for patchfile in patches:
+        with open(path.join(TABLES_PATH, patchfile)) as f:
+            for line in f:
+                if '#' in line:
+                    line, _ = line.split('#', 1)
+                if '@' not in line:
+                    continue
+                location, data = line.split(':', 1)
+                pointer, filepath = location.strip().split('@')
+                length = len(data.split())
+                writes.append((filepath, int(pointer, 0x10),
+                               b'\x00' * length))
+
+    master_list = b'\x00'.join([b'A' * 48] * MASTERS) + b'\x00'
+    for filepath, suffix in [('BIN/ETC/AFLDKWA.EMI', 'a'),
+                             ('BIN/ETC/FIRST.EMI', 'b')]:
+        for attr in ['seed1', 'seed2']:
+            length = addresses['%slen' % attr]
+            writes.append((filepath, addresses[attr + suffix],
+                           b'\xff' * length))
+        key = 'master_list_afldkwa' if suffix == 'a' else 'master_list_first'
+        writes.append((filepath, addresses[key], master_list))
+
+    sizes = defaultdict(int)
+    for (filepath, pointer, data) in writes:
+        sizes[filepath] = max(sizes[filepath], pointer + len(data))
+    files = {filepath: bytearray(size + DATA_LENGTH)
+             for (filepath, size) in sizes.items()}
+    for (filepath, pointer, data) in writes:
+        files[filepath][pointer:pointer+len(data)] = data
+
+    write_iso(outfile, {f: bytes(data) for (f, data) in files.items()})
+
+    checksum = md5()
+    with open(outfile, 'rb') as f:
+        while True:
+            chunk = f.read(SECTOR_LENGTH * 0x400)
+            if not chunk:
+                break
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+if __name__ == '__main__':
+    if len(argv) not in [2, 3, 4]:
+        print('Usage: make_fixture.py OUTFILE [VERSION [SEED]]')
+        exit(2)
+    outfile = argv[1]
+    version = argv[2] if len(argv) >= 3 else '1.1'
+    seed = int(argv[3]) if len(argv) >= 4 else 0
+    checksum = make_fixture(outfile, version=version, seed=seed)
+    print('BOF3_SYNTHETIC      {0}    tables_list_{1}.txt'.format(
+        checksum, version))
@@ -0,0 +1,140 @@
+from os import path
+from shutil import copyfile
+from sys import argv, exit
+
+
+PPF_MAGIC = b'PPF30'
+PPF_ENCODING = 2
+HEADER_LENGTH = 0x3c
+DESCRIPTION_LENGTH = 50
+BLOCKCHECK_OFFSET = 0x9320
+BLOCKCHECK_LENGTH = 0x400
+SECTOR_LENGTH = 2352
+CHUNK_LENGTH = SECTOR_LENGTH * 0x200
+MAX_RECORD_LENGTH = 0xff
+# Each record costs 9 bytes of overhead, so unchanged runs shorter than
+# this are cheaper to carry inside a record than to split on.
+MERGE_GAP = 9
+
+
+def diff_runs(old_data, new_data, base_offset):
+    runs = []
+    start, end = None, None
+    for (i, (a, b)) in enumerate(zip(old_data, new_data)):
+        if a == b:
+            continue
+        if start is not None and i - end <= MERGE_GAP:
+            end = i + 1
+            continue
+        if start is not None:
+            runs.append((start, end))
+        start, end = i, i + 1
+    if start is not None:
+        runs.append((start, end))
+
+    records = []
+    for start, end in runs:
+        while start < end:
+            length = min(end - start, MAX_RECORD_LENGTH)
+            records.append((base_offset + start,
+                            new_data[start:start+length]))
+            start += length
+    return records
+
+
+def make_ppf(source, target, patchfile, description=''):
+    if path.getsize(source) != path.getsize(target):
+        raise Exception('Source and target images differ in size.')
+
+    description = description.encode('ascii')[:DESCRIPTION_LENGTH]
+    description = description.ljust(DESCRIPTION_LENGTH, b' ')
+
+    num_records, num_sectors = 0, 0
+    with open(source, 'rb') as f, open(target, 'rb') as g, \
+            open(patchfile, 'wb') as p:
+        p.write(PPF_MAGIC)
+        p.write(bytes([PPF_ENCODING]))
+        p.write(description)
+        p.write(bytes([0, 1, 0, 0]))  # BIN image, blockcheck, no undo
+        f.seek(BLOCKCHECK_OFFSET)
+        block = f.read(BLOCKCHECK_LENGTH)
+        p.write(block.ljust(BLOCKCHECK_LENGTH, b'\x00'))
+        f.seek(0)
+
+        offset = 0
+        while True:
+            old_chunk = f.read(CHUNK_LENGTH)
+            new_chunk = g.read(CHUNK_LENGTH)
+            if not old_chunk:
+                break
+            if old_chunk != new_chunk:
+                for i in range(0, len(old_chunk), SECTOR_LENGTH):
+                    old_sector = old_chunk[i:i+SECTOR_LENGTH]
+                    new_sector = new_chunk[i:i+SECTOR_LENGTH]
+                    if old_sector == new_sector:
+                        continue
+                    num_sectors += 1
+                    for record_offset, data in diff_runs(
+                            old_sector, new_sector, offset + i):
+                        p.write(record_offset.to_bytes(8, 'little'))
+                        p.write(bytes([len(data)]))
+                        p.write(data)
+                        num_records += 1
+            offset += len(old_chunk)
+
+    return num_records, num_sectors
+
+
+def apply_ppf(patchfile, image):
+    with open(patchfile, 'rb') as p:
+        data = p.read()
+
+    if data[:5] != PPF_MAGIC or data[5] != PPF_ENCODING:
+        raise Exception('%s is not a PPF 3.0 patch.' % patchfile)
+    imagetype, blockcheck, undo = data[0x38], data[0x39], data[0x3a]
+    if imagetype != 0:
+        raise Exception('Only BIN image patches are supported.')
+
+    pointer = HEADER_LENGTH
+    with open(image, 'r+b') as f:
+        if blockcheck:
+            f.seek(BLOCKCHECK_OFFSET)
+            block = f.read(BLOCKCHECK_LENGTH)
+            block = block.ljust(BLOCKCHECK_LENGTH, b'\x00')
+            if block != data[pointer:pointer+BLOCKCHECK_LENGTH]:
+                raise Exception('This patch was made for a different image.')
+            pointer += BLOCKCHECK_LENGTH
+
+        end = len(data)
+        if data[-6:-2] == b'.DIZ':
+            end -= 18 + int.from_bytes(data[-2:], 'little') + 16 + 2
+
+        while pointer < end:
+            offset = int.from_bytes(data[pointer:pointer+8], 'little')
+            length = data[pointer+8]
+            pointer += 9
+            f.seek(offset)
+            f.write(data[pointer:pointer+length])
+            pointer += length
+            if undo:
+                pointer += length
+
+
+if __name__ == '__main__':
+    if len(argv) >= 5 and argv[1] == 'make':
+        description = argv[5] if len(argv) >= 6 else ''
+        num_records, num_sectors = make_ppf(argv[2], argv[3], argv[4],
+                                            description)
+        print('Wrote %s records for %s modified sectors to %s.' % (
+            num_records, num_sectors, argv[4]))
+    elif len(argv) in [4, 5] and argv[1] == 'apply':
+        patchfile, image = argv[2], argv[3]
+        if len(argv) == 5:
+            copyfile(image, argv[4])
+            image = argv[4]
+        apply_ppf(patchfile, image)
+        print('Patched %s.' % image)
+    else:
+        print('Usage: ppf.py make SOURCE TARGET PATCH [DESCRIPTION]\n'
+              '       ppf.py apply PATCH IMAGE [OUTPUT]')
+        exit(2)
@@ -1,21 +1,50 @@
 from randomtools.tablereader import (
     TableObject, addresses, get_activated_patches, get_open_file,
     mutate_normal, get_seed, get_global_label, tblpath,
-    get_random_degree, get_difficulty, write_patch)
+    get_random_degree, get_difficulty, write_patch,
+    determine_global_table, set_table_specs, set_global_output_filename,
+    sort_good_order, set_seed, set_random_degree, set_difficulty)
 from randomtools.utils import (
     classproperty, cached_property, utilrandom as random)
 from randomtools.interface import (
     run_interface, clean_and_write, finish_interface,
     get_activated_codes, get_flags, get_outfile)
-from collections import Counter, defaultdict
+import randomtools.interface as interface
+from ppf import apply_ppf, make_ppf
+from bisect import bisect_left
+from collections import Counter, defaultdict, namedtuple
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from csv import writer as csv_writer
+from functools import partial
+from gzip import open as gzip_open
+from io import StringIO, TextIOWrapper
+from hashlib import md5
+from json import dump, dumps, load
 from math import ceil
-from os import path
-from sys import argv
+from multiprocessing import cpu_count, get_all_start_methods, get_context
+from os import path, remove
+from shutil import copyfile
+from sqlite3 import connect as sqlite_connect
+from sys import argv, exit
+from time import perf_counter, process_time, time
 from traceback import format_exc
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 
 VERSION = '3.2'
 ALL_OBJECTS = None
+CODES = {
+    'easymodo': ['easymodo'],
+    'equipanything': ['equipanything'],
+    'feyday': ['feyday', 'faeday'],
+    'thinkwell': ['thinkwell'],
+    'bluemagician': ['bluemagician', 'bluemage'],
+    'abilonym': ['abilonym'],
+    }
 
 
 class NameMixin(TableObject):
@@ -290,22 +319,52 @@ class ItemMixin(NameMixin):
             self.price = int(float('%.1g' % (self.price*2)) / 2)
 
 
+class FileIndexMixin:
+    @classmethod
+    def get_index(self, attr):
+        cache_attr = '_{0}_index'.format(attr)
+        if hasattr(self, cache_attr):
+            return getattr(self, cache_attr)
+
+        index = defaultdict(list)
+        for o in self.every:
+            index[getattr(o, attr)].append(o)
+        setattr(self, cache_attr, dict(index))
+
+        return self.get_index(attr)
+
+    @classproperty
+    def filename_index(self):
+        return self.get_index('filename')
+
+    @classmethod
+    def get_by_filename(self, filename):
+        return self.filename_index.get(filename, [])
+
+
 class DupeMixin:
     @cached_property
     def fingerprint(self):
-        return str(sorted(self.old_data.items()))
+        return tuple((attr, tuple(value) if isinstance(value, list) else value)
+                     for (attr, value) in sorted(self.old_data.items()))
 
-    @cached_property
-    def canonical_relative(self):
+    @classmethod
+    def group_duplicates(self):
+        canonicals = {}
         for o in sorted(self.every, key=lambda oo: oo.index):
-            if (isinstance(self, MonsterObject) and o is self and
-                    self.monster_name != self.old_data['monster_name']):
+            if (isinstance(o, MonsterObject) and
+                    o.monster_name != o.old_data['monster_name']):
+                o._canonical_relative = o
                 continue
-            if o.index >= self.index:
-                return self
-            if o.fingerprint == self.fingerprint:
-                assert o.is_canonical
-                return o
+            if o.fingerprint not in canonicals:
+                canonicals[o.fingerprint] = o
+            o._canonical_relative = canonicals[o.fingerprint]
+
+    @property
+    def canonical_relative(self):
+        if not hasattr(self, '_canonical_relative'):
+            self.group_duplicates()
+        return self._canonical_relative
 
     @cached_property
     def is_canonical(self):
@@ -392,6 +451,7 @@ class AbilityObject(NameMixin):
 
     BANNED_SKILLS = ['Head Cracker', 'Nue Stomp']
     LEVELUP_BANNED_SKILLS = ['Backhand']
+    ELEMENTS = ['fire', 'ice', 'lightning', 'earth', 'wind', 'holy']
 
     @property
     def intershuffle_valid(self):
@@ -400,9 +460,34 @@ class AbilityObject(NameMixin):
         return (self._levelup_rank is None
                 or self.get_bit('examinable'))
 
+    @classproperty
+    def name_groups(self):
+        if hasattr(AbilityObject, '_name_groups'):
+            return AbilityObject._name_groups
+
+        selves_by_name = defaultdict(list)
+        for a in sorted(AbilityObject.every, key=lambda a: a.index):
+            selves_by_name[a.old_name].append(a)
+
+        name_groups = {}
+        for old_name, selves in selves_by_name.items():
+            if len(selves) == 1:
+                name_groups[old_name] = (selves[0], selves[0], selves)
+                continue
+            examinable = [a for a in selves if a.get_bit('examinable')]
+            assert len(examinable) <= 1
+            unexaminable = [a for a in selves if not a.get_bit('examinable')]
+            examine_alt = examinable[0] if examinable else None
+            levelup_alt = unexaminable[0] if unexaminable else None
+            name_groups[old_name] = (examine_alt, levelup_alt, selves)
+        AbilityObject._name_groups = name_groups
+
+        return AbilityObject.name_groups
+
     @property
     def is_spare_levelup_skill(self):
-        if len([a for a in self.every if a.old_name == self.old_name]) == 1:
+        _, _, selves = self.name_groups[self.old_name]
+        if len(selves) == 1:
             return False
         return not self.intershuffle_valid
 
@@ -430,28 +515,46 @@ class AbilityObject(NameMixin):
     def examine_alt(self):
         if self.name == 'Noting':
             return None
-        selves = [a for a in self.every if a.old_name == self.old_name]
-        if len(selves) == 1:
-            return self
-        examinable = [a for a in selves if a.get_bit('examinable')]
-        assert len(examinable) <= 1
-        if examinable:
-            return examinable[0]
-        return None
+        examine_alt, _, _ = self.name_groups[self.old_name]
+        return examine_alt
 
     @cached_property
     def levelup_alt(self):
         if self.name == 'Noting':
             return None
-        selves = [a for a in self.every if a.old_name == self.old_name]
-        if len(selves) == 1:
-            return self
-        unexaminable = [a for a in selves if not a.get_bit('examinable')]
-        if len(unexaminable) > 1:
-            return sorted(unexaminable, key=lambda a: a.index)[0]
-        if unexaminable:
-            return unexaminable[0]
-        return None
+        _, levelup_alt, _ = self.name_groups[self.old_name]
+        return levelup_alt
+
+    @classmethod
+    def get_levelup_candidates(self, is_offense, is_utility, element=None):
+        if not hasattr(AbilityObject, '_levelup_candidates'):
+            levelup_candidates = defaultdict(list)
+            for c in AbilityObject.every:
+                if not (c is c.levelup_alt and c.rank >= 0 and c.old_name
+                        not in AbilityObject.LEVELUP_BANNED_SKILLS):
+                    continue
+                key = (bool(c.is_offense), bool(c.is_utility))
+                levelup_candidates[key + (None,)].append(c)
+                for e in AbilityObject.ELEMENTS:
+                    if c.get_bit(e):
+                        levelup_candidates[key + (e,)].append(c)
+            AbilityObject._levelup_candidates = dict(levelup_candidates)
+
+        key = (bool(is_offense), bool(is_utility), element)
+        return AbilityObject._levelup_candidates.get(key, [])
+
+    @classmethod
+    def get_examine_candidates(self, is_offense, is_utility):
+        if not hasattr(AbilityObject, '_examine_candidates'):
+            examine_candidates = defaultdict(list)
+            for c in AbilityObject.ranked:
+                if c is c.examine_alt and c.rank >= 0:
+                    key = (bool(c.is_offense), bool(c.is_utility))
+                    examine_candidates[key].append(c)
+            AbilityObject._examine_candidates = dict(examine_candidates)
+
+        key = (bool(is_offense), bool(is_utility))
+        return AbilityObject._examine_candidates.get(key, [])
 
     @property
     def is_offense(self):
@@ -459,8 +562,7 @@ class AbilityObject(NameMixin):
 
     @cached_property
     def is_utility(self):
-        elements = ['fire', 'ice', 'lightning', 'earth', 'wind', 'holy']
-        for e in elements:
+        for e in self.ELEMENTS:
             if self.get_bit(e):
                 return False
         return self.get_bit('psionic') or self.get_bit('status')
@@ -609,6 +711,57 @@ class LevelObject(TableObject):
         return self.agi_int & 0xf
 
 
+class CandidateTree:
+    # A Fenwick tree over a rank-sorted candidate list, where each slot is
+    # either present or removed, so that both "how many candidates are
+    # ranked below this one" and "which is the nth candidate" are O(log n).
+    def __init__(self, candidates):
+        self.candidates = candidates
+        self.positions = defaultdict(list)
+        for (n, c) in enumerate(candidates):
+            self.positions[c].append(n)
+        self.present = [True] * len(candidates)
+        self.total = len(candidates)
+        self.tree = [0] * (len(candidates) + 1)
+        for n in range(1, len(self.tree)):
+            self.tree[n] += 1
+            parent = n + (n & -n)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[n]
+
+    def set_present(self, position, present):
+        if self.present[position] == present:
+            return
+        self.present[position] = present
+        delta = 1 if present else -1
+        self.total += delta
+        n = position + 1
+        while n < len(self.tree):
+            self.tree[n] += delta
+            n += (n & -n)
+
+    def count_before(self, position):
+        count, n = 0, position
+        while n > 0:
+            count += self.tree[n]
+            n -= (n & -n)
+        return count
+
+    def get_nth(self, index):
+        position, step = 0, 1 << len(self.tree).bit_length()
+        while step:
+            if (position + step < len(self.tree)
+                    and self.tree[position + step] <= index):
+                position += step
+                index -= self.tree[position]
+            step >>= 1
+        return self.candidates[position]
+
+    def remove(self, item):
+        for position in self.positions[item]:
+            self.set_present(position, False)
+
+
 class ShopObject(TableObject):
     flag = 's'
     flag_description = 'shops and trades'
@@ -621,6 +774,12 @@ class ShopObject(TableObject):
                 s += '  {0:12} {1:>5}\n'.format(item.name, item.price)
         return s.strip()
 
+    @property
+    def spoiler_record(self):
+        return {'index': self.index, 'name': self.name,
+                'items': [{'item': item.name, 'price': item.price}
+                          for item in self.items if item.name != 'Nothing']}
+
     @property
     def name(self):
         if hasattr(self, '_name'):
@@ -694,9 +853,10 @@ class ShopObject(TableObject):
         for i in (ItemObject.every + WeaponObject.every +
                   ArmorObject.every + AccessoryObject.every):
             item_pools[i] = []
-            for s in ShopObject.every:
-                old_items = [i for i in s.old_items if i.index > 0]
-                if i in old_items:
+        for s in ShopObject.every:
+            old_items = [i for i in s.old_items if i.index > 0]
+            for i in dict.fromkeys(old_items):
+                if i in item_pools:
                     item_pools[i] += old_items
         ShopObject._item_pools = item_pools
 
@@ -712,6 +872,7 @@ class ShopObject(TableObject):
         candidates = sorted(candidates, key=lambda i: i.rank)
 
         duplicates_allowed = len(set(valid_items)) != len(valid_items)
+        trees = {}
         new_items = []
         for i in self.old_items:
             if i.index == 0:
@@ -719,33 +880,44 @@ class ShopObject(TableObject):
 
             if (not isinstance(i, ItemObject) and
                     random.random() < random_degree):
-                my_candidates = [c for c in ItemMixin.ranked_shuffle_items
-                                 if type(c) == type(i)]
+                key = type(i)
             else:
-                my_candidates = list(candidates)
-
-            index = my_candidates.index(i)
-            my_candidates[index] = None
-            my_candidates = [c for c in my_candidates if c is not i]
-            if not duplicates_allowed:
-                my_candidates = [c for c in my_candidates
-                                 if c not in new_items]
-            index = my_candidates.index(None)
-            my_candidates[index] = i
-            assert my_candidates.count(i) == 1
-
-            index = my_candidates.index(i)
-            if i in new_items:
-                my_candidates.remove(i)
-            if my_candidates:
-                max_index = len(my_candidates)-1
-                index = min(max(index, 0), max_index)
+                key = None
+            if key not in trees:
+                if key is None:
+                    trees[key] = CandidateTree(candidates)
+                else:
+                    trees[key] = CandidateTree(
+                        [c for c in ItemMixin.ranked_shuffle_items
+                         if type(c) == type(i)])
+                if not duplicates_allowed:
+                    for c in new_items:
+                        trees[key].remove(c)
+            tree = trees[key]
+
+            # The item itself only counts once, at its lowest ranked copy,
+            # and not at all if it has already been picked for this shop.
+            first = tree.positions[i][0]
+            hidden = [p for p in tree.positions[i] if tree.present[p]
+                      and (p != first or i in new_items)]
+            for p in hidden:
+                tree.set_present(p, False)
+
+            if tree.total:
+                max_index = tree.total-1
+                index = min(max(tree.count_before(first), 0), max_index)
                 index = mutate_normal(index, 0, max_index,
                                       random_degree=random_degree)
-                new_item = my_candidates[index]
+                new_item = tree.get_nth(index)
             else:
                 new_item = i
+
+            for p in hidden:
+                tree.set_present(p, True)
             new_items.append(new_item)
+            if not duplicates_allowed:
+                for t in trees.values():
+                    t.remove(new_item)
 
         self.set_items(new_items)
 
@@ -798,6 +970,13 @@ class MasterSkillsObject(TableObject):
             s += 'LV{0:0>2} {1}\n'.format(level, skill.name)
         return s.strip()
 
+    @property
+    def spoiler_record(self):
+        if self.name in self.RESTRICTED_NAMES:
+            return []
+        return [{'level': level, 'skill': skill.name}
+                for level, skill in zip(self.levels, self.skills)]
+
     @property
     def levels(self):
         levels =  [skill_level & 0xff for skill_level in self.skill_levels
@@ -928,6 +1107,17 @@ class MasterStatsObject(TableObject):
         s = '{0}\n{1}'.format(s, MasterSkillsObject.get(self.index))
         return s.strip()
 
+    @property
+    def spoiler_record(self):
+        stats = {}
+        for attr, _, _ in self.specsattrs:
+            value = getattr(self, attr)
+            if value >= 0x80:
+                value = value - 0x100
+            stats[attr] = value
+        return {'index': self.index, 'name': self.name, 'stats': stats,
+                'skills': MasterSkillsObject.get(self.index).spoiler_record}
+
     def read_data(self, filename=None, pointer=None):
         super().read_data(filename=filename, pointer=pointer)
         for attr in self.old_data:
@@ -946,26 +1136,58 @@ class MasterStatsObject(TableObject):
     def rating(self):
         return sum(v for v in self.old_data.values())
 
-    def randomize(self):
-        ratings = [mso.rating for mso in self.every]
-        target_rating = random.choice(ratings)
+    @classproperty
+    def stat_pools(self):
+        if hasattr(self, '_stat_pools'):
+            return self._stat_pools
+
         swappable_stats = [('hp', 'ap'), ('pwr', 'dfn', 'agi', 'int')]
-        stat_pools = defaultdict(list)
-        for attr in self.old_data:
+        stat_pools = {}
+        for attr in self.every[0].old_data:
             swappable = [s for s in swappable_stats if attr in s][0]
-            for stat in swappable:
-                for mso in self.every:
-                    stat_pools[attr].append(mso.old_data[stat])
-            stat_pools[attr] = sorted(stat_pools[attr])
-            setattr(self, attr, random.choice(stat_pools[attr]))
-
-        while True:
-            rating = sum(getattr(self, attr) for attr in self.old_data)
-            if rating == target_rating:
-                break
+            stat_pools[attr] = Counter(mso.old_data[stat]
+                                       for stat in swappable
+                                       for mso in self.every)
+        self._stat_pools = stat_pools
+
+        return self.stat_pools
+
+    @classproperty
+    def rating_counts(self):
+        if hasattr(self, '_rating_counts'):
+            return self._rating_counts
+
+        # rating_counts[i][r] is the number of ways to draw the stats from
+        # the i-th one onward (in sorted order) so that they add up to r.
+        rating_counts = [Counter({0: 1})]
+        for attr in reversed(sorted(self.stat_pools)):
+            counts = Counter()
+            for rating, ways in rating_counts[0].items():
+                for value, n in self.stat_pools[attr].items():
+                    counts[rating + value] += ways * n
+            rating_counts.insert(0, counts)
+        self._rating_counts = rating_counts
+
+        return self.rating_counts
 
-            attr = random.choice(sorted(self.old_data))
-            setattr(self, attr, random.choice(stat_pools[attr]))
+    def randomize(self):
+        ratings = [mso.rating for mso in self.every]
+        target_rating = random.choice(ratings)
+        assert self.rating_counts[0][target_rating] > 0
+
+        remaining = target_rating
+        for (i, attr) in enumerate(sorted(self.stat_pools)):
+            candidates = [
+                (value, n * self.rating_counts[i+1][remaining - value])
+                for (value, n) in sorted(self.stat_pools[attr].items())]
+            choice = random.randint(1, sum(w for (_, w) in candidates))
+            for value, weight in candidates:
+                choice -= weight
+                if choice <= 0:
+                    break
+            setattr(self, attr, value)
+            remaining -= value
+        assert remaining == 0
 
     def cleanup(self):
         for attr in self.old_data:
@@ -998,6 +1220,19 @@ class BaseStatsObject(NameMixin):
                                                        skill.name, skill.cost)
         return s.strip()
 
+    @property
+    def spoiler_record(self):
+        stats = ['hp', 'ap', 'pwr', 'dfn', 'agi', 'int']
+        skills = []
+        for l in self.levels:
+            if l.ability > 0:
+                skill = AbilityObject.get(l.ability)
+                skills.append({'level': l.level, 'skill': skill.name,
+                               'cost': skill.cost})
+        return {'index': self.index, 'name': self.name,
+                'stats': {stat: getattr(self, stat) for stat in stats},
+                'skills': skills}
+
     @property
     def intershuffle_valid(self):
         return self.name not in self.RESTRICTED_NAMES
@@ -1070,19 +1305,14 @@ class BaseStatsObject(NameMixin):
                     continue
 
                 assert base_rank.index != 0 and base_misc.index != 0
-                candidates = [
-                    c for c in AbilityObject.every
-                    if c.is_offense == base_misc.is_offense
-                    and c.is_utility == base_misc.is_utility
-                    and c is c.levelup_alt and c.rank >= 0
-                    and c.old_name not in AbilityObject.LEVELUP_BANNED_SKILLS]
+                new_element = None
                 for e in shuffled_elements:
                     if base_misc.get_bit(e):
                         index = shuffled_elements.index(e)
                         new_element = elements[index]
-                        candidates = [c for c in candidates
-                                      if c.get_bit(new_element)]
                         break
+                candidates = AbilityObject.get_levelup_candidates(
+                    base_misc.is_offense, base_misc.is_utility, new_element)
                 if not candidates:
                     continue
 
@@ -1301,6 +1531,11 @@ class ManilloStockObject(TableObject):
             s += '  %s\n' % t
         return s.strip()
 
+    @property
+    def spoiler_record(self):
+        return {'index': self.index, 'name': self.name,
+                'trades': [t.spoiler_record for t in self.trades]}
+
     @property
     def name(self):
         return {
@@ -1319,7 +1554,7 @@ class ManilloStockObject(TableObject):
                 for i in self.trade_indexes if i != 0xFF]
 
 
-class ChestObject(DupeMixin, AcquireItemMixin):
+class ChestObject(DupeMixin, FileIndexMixin, AcquireItemMixin):
     flag_description = 'treasure'
 
     def __repr__(self):
@@ -1333,6 +1568,13 @@ class ChestObject(DupeMixin, AcquireItemMixin):
                 self.index, self.area_code, self.memory, zenny)
         return s
 
+    @property
+    def spoiler_record(self):
+        return {'index': self.index, 'area': self.area_code,
+                'area_name': self.area_name, 'memory': self.memory,
+                'item': self.item.name if self.item else None,
+                'zenny': None if self.item else self.value}
+
     @property
     def value(self):
         if self.item:
@@ -1346,6 +1588,10 @@ class ChestObject(DupeMixin, AcquireItemMixin):
         assert filename.startswith('AREA') and filename.endswith('.EMI')
         return int(filename[-7:-4])
 
+    @classproperty
+    def area_index(self):
+        return self.get_index('area_code')
+
     @property
     def area_name(self):
         if hasattr(self, '_area_name'):
@@ -1378,7 +1624,7 @@ class ChestObject(DupeMixin, AcquireItemMixin):
             self.item_type, self.item_index = 4, 0xf
 
 
-class GeneObject(TableObject):
+class GeneObject(FileIndexMixin, TableObject):
     flag = 'g'
     flag_description = 'dragon gene locations'
     intershuffle_attributes = ['gene_index']
@@ -1397,7 +1643,7 @@ class ChrysmObject(TableObject):
 
     @property
     def gene(self):
-        genes = [g for g in GeneObject.every if g.filename == self.filename]
+        genes = GeneObject.get_by_filename(self.filename)
         assert len(genes) == 1
         gene = genes[0]
         assert gene.old_data['gene_index'] == self.old_data['gene_index']
@@ -1425,7 +1671,7 @@ class FormationObject(TableObject):
 
     @cached_property
     def available_enemies(self):
-        return [e for e in MonsterObject.every if e.filename == self.filename]
+        return MonsterObject.get_by_filename(self.filename)
 
     @property
     def enemies(self):
@@ -1442,6 +1688,8 @@ class FormationObject(TableObject):
 class ManilloItemObject(DupeMixin, AcquireItemMixin):
     flag = 's'
     custom_random_enable = 's'
+    FISH_BUNDLE_CHOICES = 4
+    FISH_BUNDLE_SCAN = 64
 
     def __repr__(self):
         fishdesc = ', '.join(
@@ -1449,6 +1697,38 @@ class ManilloItemObject(DupeMixin, AcquireItemMixin):
         s = '{1} ({2})'.format(self.index, self.item.name, fishdesc)
         return s.strip()
 
+    @property
+    def spoiler_record(self):
+        return {'item': self.item.name,
+                'fishes': [{'fish': fish.name, 'quantity': n}
+                           for (fish, n) in self.fishes]}
+
+    @classproperty
+    def fish_items(self):
+        return sorted([ItemObject.get(i) for i in range(0x38, 0x4d)],
+                      key=lambda i: i.old_data['price'])
+
+    @classproperty
+    def fish_bundles(self):
+        if hasattr(self, '_fish_bundles'):
+            return self._fish_bundles
+
+        # Every way to fill up to two slots with 1-9 of a fish, sorted by
+        # value, so the slots left after the first fish are a bisect away.
+        fishes = [f for f in self.fish_items if f.old_data['price'] > 0]
+        singles = [((f, n),) for f in fishes for n in range(1, 10)]
+        pairs = [(a, b) for (i, (a,)) in enumerate(singles)
+                 for (b,) in singles[i+1:] if a[0] is not b[0]]
+
+        def bundle_value(bundle):
+            return sum(fish.old_data['price'] * n for (fish, n) in bundle)
+
+        bundles = sorted(singles + pairs, key=lambda b: (
+            bundle_value(b), [(fish.index, n) for (fish, n) in b]))
+        self._fish_bundles = ([bundle_value(b) for b in bundles], bundles)
+
+        return self.fish_bundles
+
     @property
     def fishes(self):
         fishes = []
@@ -1479,56 +1759,46 @@ class ManilloItemObject(DupeMixin, AcquireItemMixin):
         old_item_value = self.old_item.old_data['price']
         target_value = random.randint(min(values), max(values))
         target_fish_value = target_value * old_fish_value / old_item_value
-        new_fishes = [(None, 0), (None, 0), (None, 0)]
-        candidate_fishes = sorted(
-            [ItemObject.get(i) for i in range(0x38, 0x4d)],
-            key=lambda i: i.old_data['price'])
+        candidate_fishes = [f for f in self.fish_items
+                            if f.old_data['price'] > 0]
         target_fish_value = max(
             target_fish_value, min([f.old_data['price']
                                     for f in candidate_fishes]))
+        max_price = target_fish_value * 2
         candidate_fishes = [c for c in candidate_fishes
-                            if c.old_data['price'] <= target_fish_value * 2]
+                            if c.old_data['price'] <= max_price]
         max_index = len(candidate_fishes)-1
-        stagnation_counter = 0
-        MAX_STAGNATION = 20
-        while True:
-            index = int(round(
-                (random.random() ** (1/self.random_degree)) * max_index))
-            replacement_fish = candidate_fishes[index]
-            for (fish, n) in new_fishes:
-                if fish == replacement_fish:
-                    replace_fish = fish
-                    replace_quantity = n
-                    replacement_quantity = n + 1
-                    break
-            else:
-                replace_fish, replace_quantity = random.choice(new_fishes)
-                if replace_fish is not None:
-                    replace_value = (replace_fish.old_data['price']
-                                     * replace_quantity)
-                    replacement_quantity = ceil(
-                        replace_value / replacement_fish.old_data['price'])
-                else:
-                    replacement_quantity = random.randint(
-                        1, random.randint(1, 9))
-
-            if 1 <= replacement_quantity <= 9:
-                stagnation_counter = 0
-                new_fishes.remove((replace_fish, replace_quantity))
-                new_fishes.append((replacement_fish, replacement_quantity))
-            else:
-                stagnation_counter += 1
-                if stagnation_counter >= MAX_STAGNATION:
-                    break
-                continue
-
-            current_value = 0
-            for (fish, n) in new_fishes:
-                if fish is None:
-                    continue
-                current_value += (fish.old_data['price'] * n)
-            if current_value >= target_fish_value:
-                break
+        index = int(round(
+            (random.random() ** (1/self.random_degree)) * max_index))
+        first_fish = candidate_fishes[index]
+        first_price = first_fish.old_data['price']
+        first_quantity = min(random.randint(1, random.randint(1, 9)),
+                             ceil(target_fish_value / first_price))
+        new_fishes = [(first_fish, first_quantity)]
+
+        remaining_value = target_fish_value - (first_price * first_quantity)
+        if remaining_value > 0:
+            bundle_values, bundles = self.fish_bundles
+            start = bisect_left(bundle_values, remaining_value)
+            valid_bundles = []
+            for bundle in bundles[start:start+self.FISH_BUNDLE_SCAN]:
+                if all(fish is not first_fish and
+                       fish.old_data['price'] <= max_price
+                       for (fish, n) in bundle):
+                    valid_bundles.append(bundle)
+                    if len(valid_bundles) >= self.FISH_BUNDLE_CHOICES:
+                        break
+            if not valid_bundles:
+                # Nothing close enough, so take the most valuable bundle
+                # left: a full stack of each of the two priciest fish.
+                priciest = [f for f in candidate_fishes[-3:]
+                            if f is not first_fish][-2:]
+                valid_bundles.append(tuple((f, 9) for f in priciest))
+            if valid_bundles[0]:
+                new_fishes.extend(random.choice(valid_bundles))
+
+        while len(new_fishes) < 3:
+            new_fishes.append((None, 0))
 
         new_fishes = sorted(
             new_fishes, key=lambda f: (99999 if f[0] is None else f[0].index))
@@ -1537,7 +1807,7 @@ class ManilloItemObject(DupeMixin, AcquireItemMixin):
         self.fish_quantities = [n if fish else 0 for fish, n in new_fishes]
 
 
-class MonsterObject(DupeMixin, NameMixin):
+class MonsterObject(DupeMixin, FileIndexMixin, NameMixin):
     flag = 'e'
     flag_description = 'enemies'
     custom_random_enable = 'e'
@@ -1575,23 +1845,50 @@ class MonsterObject(DupeMixin, NameMixin):
             resistances = self.resistances[(i*3):(i*3)+3]
             s += ' | '.join('{0:7} {1}'.format(
                 a, b) for (a, b) in zip(resistances_names, resistances)) + '\n'
-        steal_rate = (2**self.steal_rate) / 128 if self.steal_rate else 0
-        steal_rate = int(round(steal_rate*100))
         s += 'Steal: {0} {1}%\n'.format(
-            self.steal_item.name if self.steal_item else None, steal_rate)
-        drop_rate = (2**self.drop_rate) / 128 if self.drop_rate else 0
-        drop_rate = int(round(drop_rate*100))
+            self.steal_item.name if self.steal_item else None,
+            self.steal_percent)
         s += 'Drop: {0} {1}%\n'.format(
-            self.drop_item.name if self.drop_item else None, drop_rate)
-        skills = []
-        for a in sorted(self.abilities, key=lambda x: x.name):
-            if a.old_name in ['Nothing', 'Noting'] or not a.old_name:
-                continue
-            skills.append('{0}{1}'.format(
-                a.name, '*' if a.get_bit('examinable') else ''))
+            self.drop_item.name if self.drop_item else None,
+            self.drop_percent)
+        skills = ['{0}{1}'.format(a.name, '*' if examinable else '')
+                  for (a, examinable) in self.spoiler_abilities]
         s += ', '.join(skills) + '\n'
         return s.strip()
 
+    @property
+    def spoiler_record(self):
+        stats = ['hp', 'ap', 'pwr', 'dfn', 'agi', 'int']
+        return {
+            'index': self.index, 'name': self.name, 'level': self.level,
+            'stats': {stat: getattr(self, stat) for stat in stats},
+            'resistances': dict(zip(self.RESISTANCES_NAMES,
+                                    self.resistances)),
+            'steal': {'item': (self.steal_item.name if self.steal_item
+                               else None),
+                      'rate': self.steal_percent},
+            'drop': {'item': self.drop_item.name if self.drop_item else None,
+                     'rate': self.drop_percent},
+            'skills': [{'skill': a.name, 'examinable': examinable}
+                       for (a, examinable) in self.spoiler_abilities],
+            }
+
+    @property
+    def steal_percent(self):
+        steal_rate = (2**self.steal_rate) / 128 if self.steal_rate else 0
+        return int(round(steal_rate*100))
+
+    @property
+    def drop_percent(self):
+        drop_rate = (2**self.drop_rate) / 128 if self.drop_rate else 0
+        return int(round(drop_rate*100))
+
+    @property
+    def spoiler_abilities(self):
+        return [(a, bool(a.get_bit('examinable')))
+                for a in sorted(self.abilities, key=lambda x: x.name)
+                if a.old_name not in ['Nothing', 'Noting'] and a.old_name]
+
     @property
     def abilities(self):
         abilities = set(self.initial_skills)
@@ -1737,10 +2034,8 @@ class MonsterObject(DupeMixin, NameMixin):
                 skill_map[existing.index] = existing.index
                 continue
 
-            candidates = [s for s in AbilityObject.ranked if s is s.examine_alt
-                          and existing.is_offense == s.is_offense
-                          and existing.is_utility == s.is_utility
-                          and s.rank >= 0]
+            candidates = AbilityObject.get_examine_candidates(
+                existing.is_offense, existing.is_utility)
             new_skill = existing.examine_alt.get_similar(
                 candidates, random_degree=MonsterAbilityObject.random_degree)
             skill_map[existing.index] = new_skill.index
@@ -1757,19 +2052,43 @@ class MonsterObject(DupeMixin, NameMixin):
             self.mutate_loot()
             self.reseed('skills')
 
+    @classproperty
+    def difficulty_ratios(self):
+        if hasattr(MonsterObject, '_difficulty_ratios'):
+            return MonsterObject._difficulty_ratios
+
+        monsters = [m for m in MonsterObject.ranked
+                    if m.is_canonical and m.rank >= 0]
+        max_index = len(monsters) - 1
+        MonsterObject._difficulty_ratios = {
+            m: n / max_index for (n, m) in enumerate(monsters)}
+
+        return MonsterObject.difficulty_ratios
+
+    @classproperty
+    def difficulty_caps(self):
+        if hasattr(MonsterObject, '_difficulty_caps'):
+            return MonsterObject._difficulty_caps
+
+        difficulty_caps = {}
+        for (attr, length, _) in MonsterObject.every[0].specsattrs:
+            if attr in MonsterObject.difficulty_attrs:
+                assert 1 <= length <= 2
+                difficulty_caps[attr] = 0xFE if length == 1 else 0xFFFE
+        MonsterObject._difficulty_caps = difficulty_caps
+
+        return MonsterObject.difficulty_caps
+
     def difficulty_boost(self):
         if self.random_difficulty == 1.0:
             return
 
-        monsters = [m for m in MonsterObject.ranked
-                    if m.is_canonical and m.rank >= 0]
-        if self not in monsters:
+        if self not in self.difficulty_ratios:
             return
 
         if self.random_difficulty > 1.0:
             difficulty = self.random_difficulty - 1
-            index = monsters.index(self)
-            ranked_ratio = index / (len(monsters)-1)
+            ranked_ratio = self.difficulty_ratios[self]
             difficulty = (difficulty * ranked_ratio) + 1
         else:
             difficulty = self.random_difficulty
@@ -1781,14 +2100,8 @@ class MonsterObject(DupeMixin, NameMixin):
                 value2 = int(round(value * random.uniform(1.0, difficulty)))
                 value = max(value, value2)
 
-            length = [l for (attr, l, _) in self.specsattrs
-                      if attr == diffattr][0]
-            assert 1 <= length <= 2
-            if length == 1:
-                value = min(value, max(0xFE, self.old_data[diffattr]))
-            elif length == 2:
-                value = min(value, max(0xFFFE, self.old_data[diffattr]))
-
+            cap = self.difficulty_caps[diffattr]
+            value = min(value, max(cap, self.old_data[diffattr]))
             setattr(self, diffattr, value)
 
         new_resistances = []
@@ -1844,10 +2157,12 @@ def write_seed_number():
     a.write(seed1)
     a.seek(addresses.seed2a)
     a.write(seed2)
+    a.close()
     b.seek(addresses.seed1b)
     b.write(seed1)
     b.seek(addresses.seed2b)
     b.write(seed2)
+    b.close()
 
 
 def activate_blue_magician_code():
@@ -1903,13 +2218,64 @@ def activate_abilonym(filename):
             a._rename = name
 
 
-def write_spoiler(all_objects):
-    SPOILER_FILENAME = 'bof3r_spoiler_{0}.txt'.format(get_seed())
-    f = open(SPOILER_FILENAME, 'w+')
+SPOILER_FORMATS = ['txt', 'jsonl', 'csv']
+SPOILER_COMPRESSIONS = ['gz', 'zst']
+
+
+def parse_spoiler_format(spoiler_format):
+    spoiler_format, _, compression = spoiler_format.partition('.')
+    if spoiler_format not in SPOILER_FORMATS:
+        raise Exception('Unknown spoiler format: %s' % spoiler_format)
+    if compression and compression not in SPOILER_COMPRESSIONS:
+        raise Exception('Unknown spoiler compression: %s' % compression)
+    if compression == 'zst' and zstandard is None:
+        raise Exception('Writing .zst spoilers requires the zstandard '
+                        'package.')
+    return spoiler_format, compression
+
+
+def open_spoiler(filename, spoiler_format, compression):
+    # The csv module writes its own line endings; everything else gets the
+    # platform's, like the original text spoiler.
+    newline = '' if spoiler_format == 'csv' else None
+    if compression == 'gz':
+        return gzip_open(filename, 'wt', newline=newline)
+    if compression == 'zst':
+        writer = zstandard.ZstdCompressor().stream_writer(
+            open(filename, 'wb'))
+        return TextIOWrapper(writer, newline=newline)
+    return open(filename, 'w+', newline=newline)
+
+
+def spoiler_sections():
+    yield 'masters', MasterStatsObject.every
+    yield 'characters', BaseStatsObject.every
+    yield 'monsters', sorted((m for m in MonsterObject.every
+                              if m.is_canonical), key=lambda x: x.name)
+    yield 'shops', ShopObject.every
+    yield 'manillos', (m for m in ManilloStockObject.every if m.trades)
+    yield 'chests', (c for (a, chests) in sorted(
+        ChestObject.area_index.items()) for c in chests)
+
+
+def flatten_spoiler_record(record, prefix=''):
+    if isinstance(record, dict):
+        items = record.items()
+    elif isinstance(record, list):
+        items = enumerate(record)
+    else:
+        yield prefix, record
+        return
+    for key, value in items:
+        key = '{0}.{1}'.format(prefix, key) if prefix else str(key)
+        yield from flatten_spoiler_record(value, key)
+
 
-    f.write('{0} v{1} {2} {3} {4} {5}\n'.format(
-        get_global_label(), VERSION, get_flags(), get_seed(),
-        get_random_degree()**0.5, get_difficulty()))
+def write_spoiler_text(f, header, all_objects):
+    f.write('{label} v{version} {flags} {seed} {randomness} '
+            '{difficulty}\n'.format(**header))
+    if 'reroll' in header:
+        f.write('REROLL {0}\n'.format(header['reroll']))
 
     all_objects = sorted(all_objects, key=lambda x: x.__name__)
     random_degrees = [(o.random_degree**0.5) for o in all_objects]
@@ -1919,48 +2285,206 @@ def write_spoiler(all_objects):
     if len(set(random_diffs)) > 1:
         f.write('D:{0}\n'.format(' '.join('%s' % rd for rd in random_diffs)))
 
-    f.write('\n1. MASTERS\n'
-            '2. CHARACTERS\n'
-            '3. MONSTERS\n'
-            '4. SHOPS\n'
-            '5. MANILLOS\n'
-            '6. CHESTS\n\n')
-
-    f.write('1. MASTERS\n\n')
-    for mso in MasterStatsObject.every:
-        f.write(str(mso) + '\n\n')
-
-    f.write('2. CHARACTERS\n\n')
-    for bso in BaseStatsObject.every:
-        f.write(str(bso) + '\n\n')
-
-    f.write('3. MONSTERS\n\n')
-    for m in sorted(MonsterObject.every, key=lambda x: x.name):
-        if m.is_canonical:
-            f.write(str(m) + '\n\n')
-
-    f.write('4. SHOPS\n\n')
-    for s in ShopObject.every:
-        f.write(str(s) + '\n\n')
-
-    f.write('5. MANILLOS\n\n')
-    for mso in ManilloStockObject.every:
-        if mso.trades:
-            f.write(str(mso) + '\n\n')
-
-    f.write('6. CHESTS\n\n')
-    areas = {c.area_code for c in ChestObject.every}
-    for a in sorted(areas):
-        chests = [c for c in ChestObject.every if c.area_code == a]
-        if not chests:
+    sections = list(spoiler_sections())
+    f.write('\n')
+    for (i, (name, _)) in enumerate(sections):
+        f.write('{0}. {1}\n'.format(i+1, name.upper()))
+    f.write('\n')
+
+    for (i, (name, objects)) in enumerate(sections):
+        f.write('{0}. {1}\n\n'.format(i+1, name.upper()))
+        if name != 'chests':
+            for o in objects:
+                f.write(str(o) + '\n\n')
             continue
-        area_name = chests[0].area_name
-        f.write('AREA {0} {1}\n'.format(a, area_name))
-        for c in chests:
-            f.write(str(c) + '\n')
-        f.write('\n')
 
-    f.close()
+        area_code = None
+        for c in objects:
+            if c.area_code != area_code:
+                if area_code is not None:
+                    f.write('\n')
+                area_code = c.area_code
+                f.write('AREA {0} {1}\n'.format(area_code, c.area_name))
+            f.write(str(c) + '\n')
+        if area_code is not None:
+            f.write('\n')
+
+
+def write_spoiler_jsonl(f, header, all_objects):
+    f.write(dumps({'section': 'seed', **header}) + '\n')
+    for name, objects in spoiler_sections():
+        for o in objects:
+            f.write(dumps({'section': name, **o.spoiler_record}) + '\n')
+
+
+def write_spoiler_csv(f, header, all_objects):
+    writer = csv_writer(f)
+    writer.writerow(['section', 'index', 'field', 'value'])
+    for field, value in sorted(header.items()):
+        writer.writerow(['seed', None, field, value])
+    for name, objects in spoiler_sections():
+        for o in objects:
+            record = o.spoiler_record
+            index = record.pop('index')
+            for field, value in flatten_spoiler_record(record):
+                writer.writerow([name, index, field, value])
+
+
+def write_spoiler(all_objects, spoiler_format='txt'):
+    spoiler_format, compression = parse_spoiler_format(spoiler_format)
+    spoiler_filename = 'bof3r_spoiler_{0}.{1}'.format(get_seed(),
+                                                      spoiler_format)
+    if compression:
+        spoiler_filename = '{0}.{1}'.format(spoiler_filename, compression)
+
+    header = {
+        'label': get_global_label(), 'version': VERSION,
+        'flags': get_flags(), 'seed': get_seed(),
+        'randomness': get_random_degree()**0.5,
+        'difficulty': get_difficulty(),
+        }
+    if REROLL is not None:
+        header['reroll'] = REROLL
+    writer = {
+        'txt': write_spoiler_text,
+        'jsonl': write_spoiler_jsonl,
+        'csv': write_spoiler_csv,
+        }[spoiler_format]
+    with open_spoiler(spoiler_filename, spoiler_format, compression) as f:
+        writer(f, header, all_objects)
+
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seeds (
+    seed INTEGER, reroll TEXT, label TEXT, version TEXT, flags TEXT,
+    randomness REAL, difficulty REAL, PRIMARY KEY (seed, reroll));
+CREATE TABLE IF NOT EXISTS chests (
+    seed INTEGER, reroll TEXT, chest_index INTEGER, area INTEGER,
+    area_name TEXT, memory INTEGER, item TEXT, zenny INTEGER);
+CREATE TABLE IF NOT EXISTS shops (
+    seed INTEGER, reroll TEXT, shop_index INTEGER, shop_name TEXT,
+    slot INTEGER, item TEXT, price INTEGER);
+CREATE TABLE IF NOT EXISTS manillo_trades (
+    seed INTEGER, reroll TEXT, trader_index INTEGER, trader_name TEXT,
+    slot INTEGER, item TEXT);
+CREATE TABLE IF NOT EXISTS manillo_fishes (
+    seed INTEGER, reroll TEXT, trader_index INTEGER, slot INTEGER,
+    fish TEXT, quantity INTEGER);
+CREATE TABLE IF NOT EXISTS masters (
+    seed INTEGER, reroll TEXT, master_index INTEGER, name TEXT, hp INTEGER,
+    ap INTEGER, pwr INTEGER, dfn INTEGER, agi INTEGER, int INTEGER);
+CREATE TABLE IF NOT EXISTS master_skills (
+    seed INTEGER, reroll TEXT, master_index INTEGER, level INTEGER,
+    ability TEXT);
+CREATE TABLE IF NOT EXISTS characters (
+    seed INTEGER, reroll TEXT, character_index INTEGER, name TEXT,
+    hp INTEGER, ap INTEGER, pwr INTEGER, dfn INTEGER, agi INTEGER,
+    int INTEGER);
+CREATE TABLE IF NOT EXISTS character_skills (
+    seed INTEGER, reroll TEXT, character_index INTEGER, level INTEGER,
+    ability TEXT, cost INTEGER);
+CREATE TABLE IF NOT EXISTS monsters (
+    seed INTEGER, reroll TEXT, monster_index INTEGER, name TEXT,
+    level INTEGER, hp INTEGER, ap INTEGER, pwr INTEGER, dfn INTEGER,
+    agi INTEGER, int INTEGER, steal_item TEXT, steal_rate INTEGER,
+    drop_item TEXT, drop_rate INTEGER);
+CREATE TABLE IF NOT EXISTS monster_skills (
+    seed INTEGER, reroll TEXT, monster_index INTEGER, ability TEXT,
+    examinable INTEGER);
+CREATE INDEX IF NOT EXISTS chests_item ON chests (item, seed);
+CREATE INDEX IF NOT EXISTS chests_area ON chests (area, seed);
+CREATE INDEX IF NOT EXISTS shops_item ON shops (item, seed);
+CREATE INDEX IF NOT EXISTS manillo_trades_item ON manillo_trades (item, seed);
+CREATE INDEX IF NOT EXISTS master_skills_ability
+    ON master_skills (ability, seed);
+CREATE INDEX IF NOT EXISTS character_skills_ability
+    ON character_skills (ability, seed);
+CREATE INDEX IF NOT EXISTS monster_skills_ability
+    ON monster_skills (ability, seed);
+CREATE INDEX IF NOT EXISTS monsters_steal_item ON monsters (steal_item, seed);
+CREATE INDEX IF NOT EXISTS monsters_drop_item ON monsters (drop_item, seed);
+"""
+CATALOG_TABLES = ['seeds', 'chests', 'shops', 'manillo_trades',
+                  'manillo_fishes', 'masters', 'master_skills', 'characters',
+                  'character_skills', 'monsters', 'monster_skills']
+CATALOG_STATS = ['hp', 'ap', 'pwr', 'dfn', 'agi', 'int']
+
+
+def catalog_rows(seed):
+    yield 'seeds', (seed, get_global_label(), VERSION, get_flags(),
+                    get_random_degree()**0.5, get_difficulty())
+
+    for name, objects in spoiler_sections():
+        for o in objects:
+            r = o.spoiler_record
+            if name == 'chests':
+                yield 'chests', (seed, r['index'], r['area'],
+                                 r['area_name'], r['memory'], r['item'],
+                                 r['zenny'])
+            elif name == 'shops':
+                for (slot, item) in enumerate(r['items']):
+                    yield 'shops', (seed, r['index'], r['name'], slot,
+                                    item['item'], item['price'])
+            elif name == 'manillos':
+                for (slot, trade) in enumerate(r['trades']):
+                    yield 'manillo_trades', (seed, r['index'], r['name'],
+                                             slot, trade['item'])
+                    for fish in trade['fishes']:
+                        yield 'manillo_fishes', (seed, r['index'], slot,
+                                                 fish['fish'],
+                                                 fish['quantity'])
+            elif name == 'masters':
+                stats = [r['stats'][stat] for stat in CATALOG_STATS]
+                yield 'masters', (seed, r['index'], r['name'], *stats)
+                for skill in r['skills']:
+                    yield 'master_skills', (seed, r['index'],
+                                            skill['level'], skill['skill'])
+            elif name == 'characters':
+                stats = [r['stats'][stat] for stat in CATALOG_STATS]
+                yield 'characters', (seed, r['index'], r['name'], *stats)
+                for skill in r['skills']:
+                    yield 'character_skills', (seed, r['index'],
+                                               skill['level'], skill['skill'],
+                                               skill['cost'])
+            elif name == 'monsters':
+                stats = [r['stats'][stat] for stat in CATALOG_STATS]
+                yield 'monsters', (seed, r['index'], r['name'], r['level'],
+                                   *stats, r['steal']['item'],
+                                   r['steal']['rate'], r['drop']['item'],
+                                   r['drop']['rate'])
+                for skill in r['skills']:
+                    yield 'monster_skills', (seed, r['index'], skill['skill'],
+                                             skill['examinable'])
+
+
+def write_catalog(filename):
+    # A rerolled seed is stored next to the original, not over it; the
+    # original seed's rows have an empty reroll.
+    seed = get_seed()
+    reroll = REROLL or ''
+    rows = defaultdict(list)
+    for table, row in catalog_rows(seed):
+        rows[table].append((seed, reroll) + row[1:])
+
+    # Batch workers share one catalog file, so each seed goes in as a
+    # single transaction and waits out the other writers' locks.
+    connection = sqlite_connect(filename, timeout=600)
+    try:
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(CATALOG_SCHEMA)
+        with connection:
+            for table in CATALOG_TABLES:
+                connection.execute(
+                    'DELETE FROM {0} WHERE seed = ? AND reroll = ?'.format(
+                        table), (seed, reroll))
+                if not rows[table]:
+                    continue
+                placeholders = ', '.join('?' * len(rows[table][0]))
+                connection.executemany(
+                    'INSERT INTO {0} VALUES ({1})'.format(table, placeholders),
+                    rows[table])
+    finally:
+        connection.close()
 
 
 def write_cue_file():
@@ -1973,21 +2497,31 @@ def write_cue_file():
     f.close()
 
 
+def write_ppf_file(sourcefile):
+    filename = get_outfile()
+    ppf_filename = '.'.join(filename.split('.')[:-1] + ['ppf'])
+    description = '{0} v{1} {2}'.format(get_global_label(), VERSION,
+                                         get_seed())
+    _, num_sectors = make_ppf(sourcefile, filename, ppf_filename,
+                              description=description)
+    remove(filename)
+    print('Wrote {0} modified sectors to {1}.'.format(
+        num_sectors, ppf_filename))
+    return num_sectors
+
+
 def rewrite_master_list():
     if MasterStatsObject.flag not in get_flags():
         return
 
     f = get_open_file('BIN/ETC/AFLDKWA.EMI', sandbox=True)
     f.seek(addresses.master_list_afldkwa)
-    messages = []
-    message = b''
-    while len(messages) < 17:
-        peek = f.read(1)
-        if peek == b'\x00':
-            messages.append(message)
-            message = b''
-        else:
-            message += peek
+    data = b''
+    while data.count(b'\x00') < 17:
+        chunk = f.read(0x800)
+        assert chunk
+        data += chunk
+    messages = data.split(b'\x00')[:17]
 
     def format_entry(mso, entry, short=False):
         if entry is None:
@@ -2082,54 +2616,604 @@ def rewrite_master_list():
     f.close()
 
 
-if __name__ == '__main__':
-    try:
-        print('You are using the Breath of Fire III randomizer,\n'
-              '"The Vast and the Violent", version %s.\n' % VERSION)
+class Profiler:
+    PROFILED_METHODS = [
+        'read_data', 'write_data', 'full_randomize', 'full_preclean',
+        'full_cleanup', 'randomize', 'mutate', 'preclean', 'cleanup']
+    COUNTED_ATTRIBUTES = ['rank', 'get_similar']
+
+    def __init__(self):
+        self.stack = []
+        self.timings = {}
+        self.self_times = defaultdict(float)
+        self.counts = Counter()
+        self.active = set()
+
+    @contextmanager
+    def phase(self, name):
+        self.stack.append([name, 0.0])
+        stack_key = ';'.join(n for (n, _) in self.stack)
+        start_wall, start_cpu = perf_counter(), process_time()
+        try:
+            yield
+        finally:
+            wall = perf_counter() - start_wall
+            cpu = process_time() - start_cpu
+            _, child_wall = self.stack.pop()
+            self.self_times[stack_key] += wall - child_wall
+            if self.stack:
+                self.stack[-1][1] += wall
+            if name not in self.timings:
+                self.timings[name] = {'calls': 0, 'wall': 0.0, 'cpu': 0.0}
+            self.timings[name]['calls'] += 1
+            self.timings[name]['wall'] += wall
+            self.timings[name]['cpu'] += cpu
+
+    @staticmethod
+    def get_name(receiver, attr):
+        cls = receiver if isinstance(receiver, type) else type(receiver)
+        return '{0}.{1}'.format(cls.__name__, attr)
+
+    def timed(self, attr, function):
+        def wrapped(receiver, *args, **kwargs):
+            key = (id(receiver), attr)
+            if key in self.active:
+                return function(receiver, *args, **kwargs)
+            self.active.add(key)
+            try:
+                with self.phase(self.get_name(receiver, attr)):
+                    return function(receiver, *args, **kwargs)
+            finally:
+                self.active.discard(key)
+        return wrapped
+
+    def counted(self, attr, function):
+        def wrapped(receiver, *args, **kwargs):
+            key = (id(receiver), attr)
+            if key in self.active:
+                return function(receiver, *args, **kwargs)
+            self.active.add(key)
+            try:
+                self.counts[self.get_name(receiver, attr)] += 1
+                return function(receiver, *args, **kwargs)
+            finally:
+                self.active.discard(key)
+        return wrapped
+
+    def wrap_attribute(self, attr, descriptor):
+        if attr in self.COUNTED_ATTRIBUTES:
+            wrapper = self.counted
+        else:
+            wrapper = self.timed
+
+        if type(descriptor) is property:
+            return property(wrapper(attr, descriptor.fget),
+                            descriptor.fset, descriptor.fdel)
+        if isinstance(descriptor, classmethod):
+            return classmethod(wrapper(attr, descriptor.__func__))
+        if callable(descriptor):
+            return wrapper(attr, descriptor)
+        return None
 
-        ALL_OBJECTS = [g for g in globals().values()
-                       if isinstance(g, type) and issubclass(g, TableObject)
-                       and g not in [TableObject]]
-        codes = {
-            'easymodo': ['easymodo'],
-            'equipanything': ['equipanything'],
-            'feyday': ['feyday', 'faeday'],
-            'thinkwell': ['thinkwell'],
-            'bluemagician': ['bluemagician', 'bluemage'],
-            'abilonym': ['abilonym'],
+    def install(self, objects):
+        # Each function is wrapped once, on the class whose own __dict__
+        # defines it, and is credited to the class of the object it was
+        # called on. When a call goes through super() to the same
+        # attribute on the same object, only the outermost call is timed
+        # and counted.
+        classes = {TableObject}
+        for o in objects:
+            classes |= {c for c in o.__mro__ if c not in TableObject.__mro__}
+
+        for cls in classes:
+            for attr in self.PROFILED_METHODS + self.COUNTED_ATTRIBUTES:
+                if attr not in cls.__dict__:
+                    continue
+                wrapped = self.wrap_attribute(attr, cls.__dict__[attr])
+                if wrapped is not None:
+                    setattr(cls, attr, wrapped)
+
+    def write(self, filename):
+        report = {
+            'version': VERSION,
+            'seed': get_seed(),
+            'flags': get_flags(),
+            'codes': sorted(get_activated_codes()),
+            'timings': self.timings,
+            'counts': dict(self.counts),
             }
-        run_interface(ALL_OBJECTS, snes=False, codes=codes,
-                      custom_degree=True, custom_difficulty=True)
+        with open('{0}.json'.format(filename), 'w+') as f:
+            dump(report, f, indent=2, sort_keys=True)
 
-        if 'bluemagician' in get_activated_codes():
-            print('SKILL EXAMINE CODE ACTIVATED')
-            activate_blue_magician_code()
+        with open('{0}.folded'.format(filename), 'w+') as f:
+            for stack_key, self_time in sorted(self.self_times.items()):
+                f.write('{0} {1}\n'.format(
+                    stack_key, int(round(self_time * 1000000))))
 
-        if 'thinkwell' in get_activated_codes():
-            print('FOUNTAIN PEN CODE ACTIVATED')
 
-        if 'equipanything' in get_activated_codes():
-            print('EQUIP ANYTHING CODE ACTIVATED')
+PROFILER = None
 
-        if 'easymodo' in get_activated_codes():
-            print('DEBUG MODE ACTIVATED')
 
-        if 'feyday' in get_activated_codes():
+def profile_phase(name):
+    if PROFILER is None:
+        return nullcontext()
+    return PROFILER.phase(name)
+
+
+def write_profile():
+    if PROFILER is not None:
+        PROFILER.write('bof3r_profile_{0}'.format(get_seed()))
+
+
+def get_all_objects():
+    return [g for g in globals().values()
+            if isinstance(g, type) and issubclass(g, TableObject)
+            and g not in [TableObject]]
+
+
+REROLL_FAMILIES = {
+    'shops': [ShopObject],
+    'treasure': [ChestObject, FairyGiftObject, FairyExploreObject,
+                 FairyPrizeObject, ManilloItemObject],
+    'masters': [MasterSkillsObject, MasterStatsObject],
+    }
+REROLL_TOUCHES = {
+    # Tables whose records a family changes outside of its own tables.
+    # MasterSkillsObject.preclean makes every master skill examinable.
+    'masters': [AbilityObject],
+    }
+REROLL = None
+REROLL_CLASSES = None
+REROLL_WRITES = None
+
+
+def get_reroll_classes(family, all_objects):
+    classes = set(REROLL_FAMILIES[family])
+    while True:
+        dependents = {o for o in all_objects if o not in classes and
+                      set(getattr(o, 'after_order', [])) & classes}
+        if not dependents:
+            break
+        classes |= dependents
+    return sorted(classes, key=lambda o: o.__name__)
+
+
+def install_reroll(reroll, all_objects):
+    # Every other class keeps the seed's original random stream, so only
+    # the chosen family (and whatever is ordered after it) comes out
+    # different from the original seed.
+    global REROLL, REROLL_CLASSES, REROLL_WRITES
+    family, subseed = reroll.split(':')
+    if family not in REROLL_FAMILIES:
+        raise Exception('Unknown reroll family: %s' % family)
+    suffix = 'reroll{0}'.format(int(subseed))
+
+    REROLL_CLASSES = get_reroll_classes(family, all_objects)
+    REROLL_WRITES = sorted(
+        set(REROLL_CLASSES) | set(REROLL_TOUCHES.get(family, [])),
+        key=lambda o: o.__name__)
+    for o in REROLL_CLASSES:
+        reseed = o.reseed
+        class_reseed = o.class_reseed
+
+        def salted_reseed(self, salt='', reseed=reseed):
+            return reseed(self, salt=salt + suffix)
+
+        def salted_class_reseed(cls, salt='', class_reseed=class_reseed):
+            return class_reseed(salt=salt + suffix)
+
+        o.reseed = salted_reseed
+        o.class_reseed = classmethod(salted_class_reseed)
+
+    REROLL = '{0}:{1}'.format(family, int(subseed))
+
+
+def activate_codes(feytxt=None, abiltxt=None):
+    if 'bluemagician' in get_activated_codes():
+        print('SKILL EXAMINE CODE ACTIVATED')
+        activate_blue_magician_code()
+
+    if 'thinkwell' in get_activated_codes():
+        print('FOUNTAIN PEN CODE ACTIVATED')
+
+    if 'equipanything' in get_activated_codes():
+        print('EQUIP ANYTHING CODE ACTIVATED')
+
+    if 'easymodo' in get_activated_codes():
+        print('DEBUG MODE ACTIVATED')
+
+    if 'feyday' in get_activated_codes():
+        if feytxt is None:
             feytxt = input('Faerie names text file? ')
-            activate_feyday(feytxt)
+        activate_feyday(feytxt)
 
-        if 'abilonym' in get_activated_codes():
+    if 'abilonym' in get_activated_codes():
+        if abiltxt is None:
             abiltxt = input('Ability names text file? ')
-            activate_abilonym(abiltxt)
+        activate_abilonym(abiltxt)
+
+
+WRITE_COUNTS = Counter()
+WRITE_ONLY = None
+
 
+def is_dirty(obj):
+    return any(getattr(obj, attr) != value
+               for (attr, value) in obj.old_data.items())
+
+
+def install_dirty_tracking():
+    # The output image starts out as a copy of the source, so a record that
+    # still matches what was read from it is already there byte for byte.
+    # Only changed records are written back.
+    if hasattr(TableObject, '_clean_write_data'):
+        return
+    TableObject._clean_write_data = TableObject.write_data
+
+    def write_data(self, *args, **kwargs):
+        relocated = any(a is not None for a in args + tuple(kwargs.values()))
+        if WRITE_ONLY is not None:
+            # The output already holds this seed; only the tables the
+            # rerolled family changes need their records written over it.
+            skip = type(self) not in WRITE_ONLY
+        else:
+            skip = not (relocated or is_dirty(self))
+        if skip:
+            WRITE_COUNTS['skipped'] += 1
+            return
+        WRITE_COUNTS['written'] += 1
+        return self._clean_write_data(*args, **kwargs)
+
+    TableObject.write_data = write_data
+
+
+def write_output(all_objects, ppf=False, spoiler_format='txt', catalog=None):
+    with profile_phase('write_seed_number'):
         write_seed_number()
+    with profile_phase('rewrite_master_list'):
         rewrite_master_list()
-        clean_and_write(ALL_OBJECTS)
+    with profile_phase('clean_and_write'):
+        clean_and_write(all_objects)
+    print('Wrote {0} changed records, skipped {1} unchanged records.'.format(
+        WRITE_COUNTS['written'], WRITE_COUNTS['skipped']))
+    if PROFILER is not None:
+        PROFILER.counts.update({'records_written': WRITE_COUNTS['written'],
+                                'records_skipped': WRITE_COUNTS['skipped']})
+
+    with profile_phase('write_spoiler'):
+        write_spoiler(all_objects, spoiler_format=spoiler_format)
+    if catalog:
+        with profile_phase('write_catalog'):
+            write_catalog(catalog)
+    if not ppf:
+        with profile_phase('write_cue_file'):
+            write_cue_file()
+
+
+def finish_output(sourcefile, ppf=False):
+    # The image is only final once finish_interface has run, so the patch
+    # has to be diffed after it.
+    with profile_phase('finish_interface'):
+        finish_interface()
+    if ppf:
+        with profile_phase('write_ppf_file'):
+            return write_ppf_file(sourcefile)
 
-        write_spoiler(ALL_OBJECTS)
-        write_cue_file()
 
-        finish_interface()
+BatchJob = namedtuple('BatchJob', ['seed', 'flags', 'random_degree',
+                                   'difficulty', 'codes'])
+BATCH_FILE_CODES = ['feyday', 'abilonym']
+
+
+def read_batch_jobs(filename):
+    jobs = []
+    with open(filename) as f:
+        for line in f:
+            if '#' in line:
+                line, _ = line.split('#', 1)
+            line = line.strip()
+            if not line:
+                continue
+
+            values = line.split()
+            while len(values) < 4:
+                values.append(None)
+            seed, flags, random_degree, difficulty = values[:4]
+            seed = int(seed)
+            if flags in [None, '.']:
+                flags = ''
+            random_degree = (0.5 if random_degree is None
+                             else float(random_degree))
+            difficulty = 1.0 if difficulty is None else float(difficulty)
+
+            codes = {}
+            for code in values[4:]:
+                if '=' in code:
+                    code, filename = code.split('=', 1)
+                else:
+                    filename = None
+                aliases = [c for c in CODES if code in CODES[c]]
+                if not aliases:
+                    raise Exception('Unknown code: %s' % code)
+                code = aliases[0]
+                if code in BATCH_FILE_CODES and filename is None:
+                    raise Exception('Seed {0}: the {1} code needs a file, '
+                                    'as in {1}=FILE.'.format(seed, code))
+                codes[code] = filename
+
+            jobs.append(BatchJob(seed, flags, random_degree,
+                                 difficulty, codes))
+
+    seeds = [job.seed for job in jobs]
+    if len(set(seeds)) != len(seeds):
+        raise Exception('Batch jobs must have unique seeds.')
+    return jobs
+
+
+def load_batch_tables(sourcefile, all_objects):
+    # Parse and rank every table once, straight from the source image.
+    # Forked workers inherit the loaded objects and only redo the
+    # per-seed part: output file, seed, flags, and randomization.
+    determine_global_table(sourcefile)
+    set_table_specs(all_objects)
+    set_global_output_filename(sourcefile)
+    all_objects = sort_good_order(all_objects)
+    for o in all_objects:
+        o.every
+    for o in all_objects:
+        o.ranked
+
+
+def get_batch_outfile(sourcefile, seed, reroll=None):
+    base, extension = path.splitext(sourcefile)
+    if reroll:
+        return '{0}.{1}.{2}{3}'.format(base, seed, reroll.replace(':', ''),
+                                       extension)
+    return '{0}.{1}{2}'.format(base, seed, extension)
+
+
+def get_settings_filename(outfile):
+    return '{0}.settings.json'.format(path.splitext(outfile)[0])
+
+
+def get_batch_settings(job, flags):
+    # Everything that decides what a batch seed's image holds. A code's
+    # text file is recorded by its contents, not its name.
+    codes = {}
+    for code, filename in sorted(job.codes.items()):
+        if filename is not None:
+            with open(filename, 'rb') as f:
+                filename = md5(f.read()).hexdigest()
+        codes[code] = filename
+    return {'version': VERSION, 'label': get_global_label(),
+            'seed': job.seed, 'flags': flags,
+            'random_degree': job.random_degree,
+            'difficulty': job.difficulty, 'codes': codes}
+
+
+def write_batch_settings(outfile, settings):
+    with open(get_settings_filename(outfile), 'w+') as f:
+        dump(settings, f, indent=2, sort_keys=True)
+
+
+def remove_batch_settings(outfile):
+    # The output is about to be replaced, so its settings no longer apply.
+    filename = get_settings_filename(outfile)
+    if path.exists(filename):
+        remove(filename)
+
+
+def restore_seed_image(sourcefile, settings, outfile):
+    # An earlier batch run of this seed left either its image or its patch,
+    # along with the settings it was made with. It is only reused if those
+    # match this job.
+    image = get_batch_outfile(sourcefile, settings['seed'])
+    patchfile = '{0}.ppf'.format(path.splitext(image)[0])
+    settings_filename = get_settings_filename(image)
+    if not path.exists(settings_filename):
+        return False
+    with open(settings_filename) as f:
+        if load(f) != settings:
+            return False
+
+    if path.exists(image):
+        copyfile(image, outfile)
+    elif path.exists(patchfile):
+        copyfile(sourcefile, outfile)
+        apply_ppf(patchfile, outfile)
+    else:
+        return False
+    return True
+
+
+def reset_seed_state(sourcefile, job, all_objects):
+    global WRITE_ONLY
+    flags = job.flags or ''.join(sorted({
+        o.flag for o in all_objects if getattr(o, 'flag', None)}))
+    settings = get_batch_settings(job, flags)
+
+    outfile = get_batch_outfile(sourcefile, job.seed, REROLL)
+    restored = False
+    if REROLL:
+        restored = restore_seed_image(sourcefile, settings, outfile)
+    else:
+        remove_batch_settings(outfile)
+    if restored:
+        WRITE_ONLY = set(REROLL_WRITES)
+    else:
+        copyfile(sourcefile, outfile)
+    set_global_output_filename(outfile)
+
+    interface.sourcefile = sourcefile
+    interface.outfile = outfile
+    interface.flags = flags
+    interface.activated_codes = set(job.codes)
+    set_seed(job.seed)
+    set_random_degree(job.random_degree ** 2)
+    set_difficulty(job.difficulty)
+    return settings, restored
+
+
+def randomize_batch_job(job, all_objects):
+    for o in sort_good_order(all_objects):
+        flag = getattr(o, 'flag', None)
+        if flag is None or flag in get_flags():
+            random.seed(job.seed)
+            o.full_randomize()
+        o.randomize_step_finished = True
+
+
+def run_batch_job(sourcefile, job, ppf=False, profile=False,
+                  spoiler_format='txt', catalog=None, reroll=None):
+    global PROFILER
+    all_objects = get_all_objects()
+    if ALL_OBJECTS is None:
+        # Without fork, the worker did not inherit the parent's tables.
+        install_dirty_tracking()
+        load_batch_tables(sourcefile, all_objects)
+    if profile:
+        PROFILER = Profiler()
+        PROFILER.install(all_objects)
+    if reroll:
+        install_reroll(reroll, all_objects)
+    log = StringIO()
+    try:
+        with redirect_stdout(log):
+            settings, restored = reset_seed_state(sourcefile, job,
+                                                  all_objects)
+            with profile_phase('randomize'):
+                randomize_batch_job(job, all_objects)
+            with profile_phase('activate_codes'):
+                activate_codes(feytxt=job.codes.get('feyday'),
+                               abiltxt=job.codes.get('abilonym'))
+            write_output(all_objects, ppf=ppf, spoiler_format=spoiler_format,
+                         catalog=catalog)
+            num_sectors = finish_output(sourcefile, ppf=ppf)
+            write_profile()
+            if not reroll:
+                write_batch_settings(get_outfile(), settings)
+        outfile = get_outfile()
+        if ppf:
+            outfile = '{0} ({1} modified sectors)'.format(
+                '.'.join(outfile.split('.')[:-1] + ['ppf']), num_sectors)
+        if reroll and restored:
+            outfile += ' (rerolled over the earlier output)'
+        elif reroll:
+            outfile += (' (no earlier output with these settings, '
+                        'wrote the whole image)')
+        return job.seed, outfile, None
+    except Exception:
+        return job.seed, None, '{0}{1}'.format(log.getvalue(), format_exc())
+
+
+def run_batch(sourcefile, jobs, processes=None, ppf=False, profile=False,
+              spoiler_format='txt', catalog=None, reroll=None):
+    # Every job runs in a fresh fork of this process, after the tables have
+    # been loaded once, so that each seed starts from the same unrandomized
+    # objects and no per-seed state leaks between seeds.
+    if 'fork' in get_all_start_methods():
+        context = get_context('fork')
+        print('Loading and ranking game objects...')
+        load_batch_tables(sourcefile, ALL_OBJECTS)
+    else:
+        context = get_context()
+
+    processes = processes or cpu_count()
+    print('Generating {0} seeds with {1} processes.'.format(
+        len(jobs), processes))
+    start_time = time()
+    failures = []
+    with context.Pool(processes, maxtasksperchild=1) as pool:
+        for seed, outfile, error in pool.imap_unordered(
+                partial(run_batch_job, sourcefile, ppf=ppf, profile=profile,
+                        spoiler_format=spoiler_format, catalog=catalog,
+                        reroll=reroll), jobs):
+            if error is None:
+                print('{0}: {1}'.format(seed, outfile))
+            else:
+                print('{0}: FAILED'.format(seed))
+                failures.append((seed, error))
+
+    for seed, error in failures:
+        print('\nSeed {0} failed:\n{1}'.format(seed, error))
+
+    elapsed = time() - start_time
+    successes = len(jobs) - len(failures)
+    print('Generated {0} of {1} seeds in {2:.1f} seconds '
+          '({3:.2f} seeds/second, {4} failed).'.format(
+              successes, len(jobs), elapsed,
+              successes / elapsed if elapsed else 0, len(failures)))
+    return not failures
+
+
+if __name__ == '__main__':
+    ALL_OBJECTS = get_all_objects()
+    install_dirty_tracking()
+
+    profile = '--profile' in argv
+    if profile:
+        argv.remove('--profile')
+
+    spoiler_format = 'txt'
+    for arg in list(argv):
+        if arg.startswith('--spoiler='):
+            spoiler_format = arg.split('=', 1)[1]
+            parse_spoiler_format(spoiler_format)
+            argv.remove(arg)
+
+    catalog = None
+    for arg in list(argv):
+        if arg.startswith('--catalog='):
+            catalog = arg.split('=', 1)[1]
+            argv.remove(arg)
+
+    reroll = None
+    for arg in list(argv):
+        if arg.startswith('--reroll='):
+            reroll = arg.split('=', 1)[1]
+            argv.remove(arg)
+
+    ppf = '--ppf' in argv
+    if ppf:
+        argv.remove('--ppf')
+
+    if '--batch' in argv:
+        index = argv.index('--batch')
+        args = argv[index+1:]
+        if len(args) not in [2, 3]:
+            print('Usage: randomizer.py --batch JOBFILE SOURCEFILE '
+                  '[PROCESSES] [--ppf] [--profile] [--spoiler=FORMAT] '
+                  '[--catalog=FILE] [--reroll=FAMILY:SUBSEED]')
+            exit(2)
+        jobfile, sourcefile = args[:2]
+        processes = int(args[2]) if len(args) == 3 else None
+        del(argv[index:])
+        success = run_batch(sourcefile, read_batch_jobs(jobfile),
+                            processes=processes, ppf=ppf, profile=profile,
+                            spoiler_format=spoiler_format, catalog=catalog,
+                            reroll=reroll)
+        exit(0 if success else 1)
+
+    try:
+        print('You are using the Breath of Fire III randomizer,\n'
+              '"The Vast and the Violent", version %s.\n' % VERSION)
+
+        if profile:
+            PROFILER = Profiler()
+            PROFILER.install(ALL_OBJECTS)
+        if reroll:
+            install_reroll(reroll, ALL_OBJECTS)
+
+        with profile_phase('run_interface'):
+            run_interface(ALL_OBJECTS, snes=False, codes=CODES,
+                          custom_degree=True, custom_difficulty=True)
+        remove_batch_settings(get_outfile())
+        with profile_phase('activate_codes'):
+            activate_codes()
+        write_output(ALL_OBJECTS, ppf=ppf, spoiler_format=spoiler_format,
+                     catalog=catalog)
+        finish_output(interface.sourcefile, ppf=ppf)
+        write_profile()
 
     except Exception:
         print(format_exc())